@@ -12,6 +12,7 @@ router = APIRouter(
     prefix="/auth", tags=["auth"], responses={404: {"description": "Not found"}}
 )
 
+
 @router.post("/sign-in")
 async def sign_in(
     user: AuthLoginSchema,
@@ -50,8 +51,12 @@ async def sign_out(
 
 
 @router.get("/me")
-async def auth_me(current_user=Depends(auth_verify)):
-    return make_success_response(current_user)
+async def auth_me(
+    current_user=Depends(auth_verify),
+    db_session=Depends(get_async_db_session),
+):
+    auth_service = AuthService(db_session)
+    return make_success_response(await auth_service.get_me(current_user))
 
 
 @router.get("/refresh-token")
@@ -1,35 +1,132 @@
-from fastapi import APIRouter, Depends
+from http import HTTPStatus
 
-from app.bill.schemas.bill import BillCrUpSchema
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+import config
+from app.bill.schemas.bill import (
+    BillCrUpSchema,
+    BillComputeSchema,
+    BillParticipantPaymentSchema,
+    BillSettleSchema,
+)
 from app.bill.services.bill import BillService
-from app.common.auth import get_current_user
+from app.bill.services.split import compute_split
+from app.common.auth import auth_verify, get_current_user
+from app.common.constants import BillExportFormat
 from app.common.response import make_success_response
-from core.common.database import get_async_db_session
+from core.common.database import AsyncSessionLocal, get_async_db_session
 
 router = APIRouter(
     prefix="/bill", tags=["bill"], responses={404: {"description": "Not found"}}
 )
 
 
+@router.get("/mine")
+async def get_my_bills(
+    cursor: str | None = None,
+    limit: int = Query(
+        default=config.DEFAULT_PAGE_SIZE, ge=1, le=config.DEFAULT_PAGE_SIZE
+    ),
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(auth_verify),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.get_my_bills(current_user, cursor, limit)
+    return make_success_response(result)
+
+
+@router.get("/shared-with-me")
+async def get_shared_with_me(
+    cursor: str | None = None,
+    limit: int = Query(
+        default=config.DEFAULT_PAGE_SIZE, ge=1, le=config.DEFAULT_PAGE_SIZE
+    ),
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(auth_verify),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.get_shared_with_me(current_user, cursor, limit)
+    return make_success_response(result)
+
+
+@router.get("/export")
+async def export_bills(
+    export_format: BillExportFormat = Query(
+        default=BillExportFormat.NDJSON, alias="format"
+    ),
+    current_user=Depends(auth_verify),
+):
+    async def content():
+        # The stream outlives the request-scoped session, so it owns its own.
+        async with AsyncSessionLocal() as db_session:
+            bill_service = BillService(db_session)
+            async for chunk in bill_service.export_bills(current_user, export_format):
+                yield chunk
+
+    if export_format == BillExportFormat.CSV:
+        media_type, file_name = "text/csv", "bills.csv"
+    else:
+        media_type, file_name = "application/x-ndjson", "bills.ndjson"
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
 @router.get("/{bill_number}")
 async def get_bill(
     bill_number: str,
+    request: Request,
+    response: Response,
     db_session=Depends(get_async_db_session),
     current_user=Depends(get_current_user),
 ):
     bill_service = BillService(db_session)
-    result = await bill_service.get_by_bill_number(current_user, bill_number)
+    result, headers = await bill_service.get_by_bill_number(
+        current_user, bill_number, request.headers.get("If-None-Match")
+    )
+    if result is None:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
     return make_success_response(result)
 
 
 @router.get("/share/{bill_number}")
 async def get_shared_bill(
     bill_number: str,
+    request: Request,
+    response: Response,
     db_session=Depends(get_async_db_session),
     current_user=Depends(get_current_user),
 ):
     bill_service = BillService(db_session)
-    result = await bill_service.get_shared_by_bill_number(current_user, bill_number)
+    result, headers = await bill_service.get_shared_by_bill_number(
+        current_user, bill_number, request.headers.get("If-None-Match")
+    )
+    if result is None:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return make_success_response(result)
+
+
+@router.post("/compute")
+async def compute_bill(compute_schema: BillComputeSchema):
+    result = compute_split(compute_schema)
+    return make_success_response(result)
+
+
+@router.post("/settle")
+async def settle_bills(
+    settle_schema: BillSettleSchema,
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(get_current_user),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.settle(current_user, settle_schema.bill_numbers)
     return make_success_response(result)
 
 
@@ -44,6 +141,19 @@ async def create_bill(
     return make_success_response(result)
 
 
+@router.post("/batch-create")
+async def batch_create_bill(
+    create_schemas: list[BillCrUpSchema],
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(get_current_user),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.batch_create(
+        user=current_user, create_schemas=create_schemas
+    )
+    return make_success_response(result)
+
+
 @router.put("/{bill_number}/update")
 async def update_bill(
     bill_number: str,
@@ -56,3 +166,34 @@ async def update_bill(
         user=current_user, bill_number=bill_number, update_schema=update_schema
     )
     return make_success_response(result)
+
+
+@router.patch("/{bill_number}")
+async def patch_bill(
+    bill_number: str,
+    merge_patch: dict = Body(..., media_type="application/merge-patch+json"),
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(get_current_user),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.patch(
+        user=current_user, bill_number=bill_number, merge_patch=merge_patch
+    )
+    return make_success_response(result)
+
+
+@router.patch("/{bill_number}/participants/payment")
+async def update_participant_payment(
+    bill_number: str,
+    payment_schema: BillParticipantPaymentSchema,
+    db_session=Depends(get_async_db_session),
+    current_user=Depends(get_current_user),
+):
+    bill_service = BillService(db_session)
+    result = await bill_service.update_participant_payment(
+        user=current_user,
+        bill_number=bill_number,
+        participant_ids=payment_schema.participant_ids,
+        payment_flag=payment_schema.payment_flag,
+    )
+    return make_success_response(result)
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, Query, UploadFile, File
 
+import config
+from app.common.constants import FileVariant
 from app.common.response import make_success_response
+from app.file.schemas.file import FileUploadIntentSchema
 from app.file.services.file import FileService
 from core.common.database import get_async_db_session
 
@@ -9,13 +12,25 @@ router = APIRouter(
 )
 
 
+@router.get("/presigned-urls")
+async def get_file_urls(
+    ids: list[int] = Query(..., min_length=1, max_length=config.DEFAULT_PAGE_SIZE),
+    variant: FileVariant = FileVariant.ORIGINAL,
+    db_session=Depends(get_async_db_session),
+):
+    file_service = FileService(db_session)
+    result = await file_service.get_urls(ids, variant)
+    return make_success_response(result)
+
+
 @router.get("/{file_id}/presigned-url")
 async def get_file_url(
     file_id: int,
+    variant: FileVariant = FileVariant.ORIGINAL,
     db_session=Depends(get_async_db_session),
 ):
     file_service = FileService(db_session)
-    result = await file_service.get_url(file_id)
+    result = await file_service.get_url(file_id, variant)
     return make_success_response(result)
 
 
@@ -29,6 +44,26 @@ async def upload_file(
     return make_success_response(result)
 
 
+@router.post("/upload-intent")
+async def create_upload_intent(
+    upload_intent: FileUploadIntentSchema,
+    db_session=Depends(get_async_db_session),
+):
+    file_service = FileService(db_session)
+    result = await file_service.create_upload_intent(upload_intent)
+    return make_success_response(result)
+
+
+@router.post("/{file_id}/complete")
+async def complete_upload(
+    file_id: int,
+    db_session=Depends(get_async_db_session),
+):
+    file_service = FileService(db_session)
+    result = await file_service.complete_upload(file_id)
+    return make_success_response(result)
+
+
 @router.delete("/{file_id}")
 async def delete_file(
     file_id: int,
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.gzip import GZipMiddleware
@@ -9,6 +11,8 @@ from starlette.responses import RedirectResponse
 
 import config
 from api.routers import routers
+from app.auth.services.revocation import session_revocations
+from app.common.social import google_openid
 from app.common.handlers import (
     base_error_handler,
     validation_exception_handler,
@@ -22,6 +26,17 @@ if config.ENVIRONMENT == "pro":
     docs_url, redoc_url, openapi_url = None, None, None
 else:
     docs_url, redoc_url, openapi_url = "/docs", "/redoc", "/openapi.json"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await session_revocations.start()
+    await google_openid.start()
+    yield
+    await google_openid.stop()
+    await session_revocations.stop()
+
+
 app = FastAPI(
     title="BillFaster app service",
     swagger_ui_parameters={
@@ -30,6 +45,7 @@ app = FastAPI(
     docs_url=docs_url,
     redoc_url=redoc_url,
     openapi_url=openapi_url,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
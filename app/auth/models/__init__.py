@@ -1 +1 @@
-from .auth_user import User, UserProfile, AuthToken
+from .auth_user import User, UserProfile, AuthToken, AuthRevokedSession
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Column, Text, DateTime, ForeignKey
+from sqlalchemy import String, Column, Text, DateTime, ForeignKey, Uuid
 
 from core.common.constants import Role
 from core.models import BillFasterBaseModel
@@ -25,6 +25,17 @@ class UserProfile(BillFasterBaseModel):
 class AuthToken(BillFasterBaseModel):
     __tablename__ = "t_auth_token"
 
-    token = Column(Text())
-    user_id = Column(String(length=255))
-    expires_at = Column(DateTime, default=None, nullable=True)
+    # SHA-256 of the refresh token, the token itself is never stored.
+    token_hash = Column(String(length=64), unique=True, index=True)
+    user_id = Column(String(length=255), index=True)
+    expires_at = Column(DateTime, default=None, nullable=True, index=True)
+    # Carried as the "sid" claim of every token issued for this session.
+    session_id = Column(Uuid, unique=True, nullable=True)
+
+
+class AuthRevokedSession(BillFasterBaseModel):
+    __tablename__ = "t_auth_revoked_sessions"
+
+    session_id = Column(Uuid, unique=True, nullable=False)
+    # Access tokens of the session are all expired by then.
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -2,19 +2,34 @@ import datetime
 import uuid
 
 from fastapi_babel import _
-from google.auth.exceptions import OAuthError
+from authlib.integrations.base_client import OAuthError
 from jose import JWTError, jwt
 from pydantic import ValidationError
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
 
 import config
-from app.auth.models.auth_user import AuthToken, User, UserProfile
+from app.auth.models.auth_user import (
+    AuthRevokedSession,
+    AuthToken,
+    User,
+    UserProfile,
+)
 from app.auth.schemas.auth import AuthSignUpSchema
+from app.auth.services.revocation import (
+    SESSION_REVOKED_CHANNEL,
+    session_revocations,
+)
 from app.common.constants import SocialProvider
-from app.common.social import social_oauth
+from app.common.social import google_openid, social_oauth
 from config import JWT_ACCESS_SECRET_KEY, ALGORITHM
-from core.common.auth import verify_password, create_token, get_hashed_password
-from core.common.constants import TokenType
+from core.common.auth import (
+    create_token,
+    get_hashed_password_async,
+    hash_token,
+    verify_and_update_password_async,
+)
+from core.common.constants import Role, TokenType
 from core.common.exceptions import (
     BillFasterBadRequestException,
     BillFasterServiceException,
@@ -25,26 +40,35 @@ from core.services.base import BillFasterBaseService
 
 class AuthService(BillFasterBaseService):
     async def auth_generate_token(self, user):
+        session_id = uuid.uuid4()
         refresh_token, refresh_token_expires_at = create_token(
             subject=user.user_id,
             token_type=TokenType.REFRESH_TOKEN,
+            claims={"sid": str(session_id)},
         )
 
+        # Everything get_current_user returns, so that validating the token
+        # needs no database round trip.
         access_token, __ = create_token(
             subject=user.user_id,
             token_type=TokenType.ACCESS_TOKEN,
+            claims={
+                "sid": str(session_id),
+                "uid": user.id,
+                "email": user.email,
+                "role": user.role,
+            },
         )
 
         try:
-            delete_statement = delete(AuthToken).where(
-                AuthToken.user_id == user.user_id
-            )
-            await self.db_session.execute(delete_statement)
+            # One session per user, signing in again revokes the previous one.
+            revoked_sessions = await self._revoke_sessions(user.user_id)
 
             token_record = AuthToken(
                 user_id=user.user_id,
-                token=refresh_token,
+                token_hash=hash_token(refresh_token),
                 expires_at=refresh_token_expires_at,
+                session_id=session_id,
             )
             self.db_session.add(token_record)
             await self.db_session.commit()
@@ -52,8 +76,38 @@ class AuthService(BillFasterBaseService):
             await self.db_session.rollback()
             raise BillFasterServiceException(message=repr(ex))
 
+        for revoked_session in revoked_sessions:
+            session_revocations.add(*revoked_session)
         return {"access_token": access_token, "refresh_token": refresh_token}
 
+    async def _revoke_sessions(
+        self, user_id: str
+    ) -> list[tuple[str, datetime.datetime]]:
+        delete_statement = (
+            delete(AuthToken)
+            .where(AuthToken.user_id == user_id)
+            .returning(AuthToken.session_id)
+        )
+        result = await self.db_session.execute(delete_statement)
+        session_ids = [str(session_id) for session_id in result.scalars() if session_id]
+
+        # No access token issued to the session outlives this.
+        expires_at = datetime.datetime.now() + datetime.timedelta(
+            minutes=config.ACCESS_TOKEN_EXPIRED
+        )
+        for session_id in session_ids:
+            self.db_session.add(
+                AuthRevokedSession(
+                    session_id=uuid.UUID(session_id), expires_at=expires_at
+                )
+            )
+            # Postgres delivers the notification to every worker on commit.
+            notify = func.pg_notify(
+                SESSION_REVOKED_CHANNEL, f"{session_id}|{expires_at.isoformat()}"
+            )
+            await self.db_session.execute(select(notify))
+        return [(session_id, expires_at) for session_id in session_ids]
+
     async def oauth_sign_in(self, provider: SocialProvider, request):
         auth_email = None
         if provider.GOOGLE:
@@ -65,33 +119,28 @@ class AuthService(BillFasterBaseService):
                     "redirect_uri": request.query_params.get("redirect_uri"),
                 }
                 token = await social_oauth.google.fetch_access_token(**params)
-                from google.oauth2 import id_token
-                from google.auth.transport import requests
-
-                userinfo = id_token.verify_oauth2_token(
-                    token["id_token"], requests.Request(), config.GOOGLE_CLIENT_ID
+                userinfo = await google_openid.verify_id_token(
+                    token["id_token"],
+                    config.GOOGLE_CLIENT_ID,
+                    access_token=token.get("access_token"),
                 )
             except OAuthError as error:
                 raise BillFasterServiceException(repr(error))
+            except JWTError as error:
+                raise BillFasterUnAuthenticatedException(message=repr(error))
 
             auth_email = userinfo.get("email")
 
         if not auth_email:
             raise BillFasterUnAuthenticatedException()
 
-        try:
-            user = await self.get_user_by_email(auth_email)
-        except:
-            user = await self.create_user(
-                user_schema=AuthSignUpSchema(
-                    user_id=str(uuid.uuid4()),
-                    password=str(uuid.uuid4()),
-                    email=auth_email,
-                    full_name=userinfo.get("name"),
-                    birthday=None,
-                    avatar=userinfo.get("picture", ""),
-                )
-            )
+        user = await self.upsert_oauth_user(
+            email=auth_email,
+            full_name=userinfo.get("name", ""),
+            avatar=userinfo.get("picture", ""),
+        )
+        if user.deleted_at is not None:
+            raise BillFasterUnAuthenticatedException()
 
         token = await self.auth_generate_token(user)
         await self.db_session.commit()
@@ -104,11 +153,18 @@ class AuthService(BillFasterBaseService):
                 message=_("There is an error in your ID or password!")
             )
 
-        if not verify_password(password, user.password):
+        verified, new_hashed_password = await verify_and_update_password_async(
+            password, user.password
+        )
+        if not verified:
             raise BillFasterBadRequestException(
                 message=_("There is an error in your ID or password!")
             )
 
+        if new_hashed_password:
+            # Committed together with the new token.
+            user.password = new_hashed_password
+
         return await self.auth_generate_token(user)
 
     async def sign_out(self, user_id):
@@ -120,41 +176,47 @@ class AuthService(BillFasterBaseService):
         if token_mngr is None:
             raise BillFasterUnAuthenticatedException()
 
-        del_stt = delete(AuthToken).where(AuthToken.user_id == user_id)
-        await self.db_session.execute(del_stt)
+        revoked_sessions = await self._revoke_sessions(user_id)
         await self.db_session.commit()
+        for revoked_session in revoked_sessions:
+            session_revocations.add(*revoked_session)
 
     async def get_current_user(self, token):
         try:
             payload = jwt.decode(token, JWT_ACCESS_SECRET_KEY, algorithms=[ALGORITHM])
             user_id = payload.get("sub")
-            if user_id is None:
+            session_id = payload.get("sid")
+            if user_id is None or session_id is None:
                 raise BillFasterUnAuthenticatedException()
         except (JWTError, ValidationError) as ex:
             raise BillFasterUnAuthenticatedException(message=repr(ex))
-        user = await self.get_user_by_id(user_id)
-        if user is None:
-            raise BillFasterUnAuthenticatedException()
 
-        token_mngr = await self.get_token_mngr_by_user_id(user.user_id)
-        if token_mngr is None:
+        if session_id in session_revocations:
             raise BillFasterUnAuthenticatedException()
 
-        user_profile = await self.get_user_profile_by_user_id(user.user_id)
         return {
-            "id": user.id,
-            "user_id": user.user_id,
-            "email": user.email,
+            "id": payload.get("uid"),
+            "user_id": user_id,
+            "email": payload.get("email"),
+            "role": payload.get("role"),
+        }
+
+    async def get_me(self, user: dict):
+        user_profile = await self.get_user_profile_by_user_id(user["user_id"])
+        return {
+            **user,
             "profile": {
                 "full_name": user_profile.full_name if user_profile else None,
                 "birthday": user_profile.birthday if user_profile else None,
                 "avatar": user_profile.avatar if user_profile else None,
             },
-            "role": user.role,
         }
 
     async def regenerate_access_token(self, refresh_token: str):
-        query = select(AuthToken).filter(AuthToken.token == refresh_token)
+        query = select(AuthToken).filter(
+            AuthToken.token_hash == hash_token(refresh_token),
+            AuthToken.expires_at > datetime.datetime.utcnow(),
+        )
         query_set = await self.db_session.execute(query)
         token_mngr = query_set.scalars().first()
         if not token_mngr:
@@ -188,10 +250,41 @@ class AuthService(BillFasterBaseService):
         query_set = await self.db_session.execute(query)
         return query_set.scalars().first()
 
+    async def upsert_oauth_user(self, email: str, full_name: str, avatar: str) -> User:
+        # DO UPDATE rather than DO NOTHING, so that RETURNING also yields an
+        # existing user. OAuth users have no password, sign_in rejects them.
+        now = datetime.datetime.now()
+        insert_statement = insert(User).values(
+            user_id=str(uuid.uuid4()),
+            email=email,
+            role=Role.USER,
+            created_at=now,
+            updated_at=now,
+        )
+        upsert_statement = insert_statement.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"email": insert_statement.excluded.email},
+        ).returning(User)
+        user = await self.db_session.scalar(upsert_statement)
+
+        profile_statement = (
+            insert(UserProfile)
+            .values(
+                user_id=user.user_id,
+                full_name=full_name,
+                avatar=avatar,
+                created_at=now,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=[UserProfile.user_id])
+        )
+        await self.db_session.execute(profile_statement)
+        return user
+
     async def create_user(self, user_schema: AuthSignUpSchema):
         user = User(
             user_id=user_schema.user_id,
-            password=get_hashed_password(user_schema.password),
+            password=await get_hashed_password_async(user_schema.password),
             email=user_schema.email,
         )
         self.db_session.add(user)
@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+
+import asyncpg
+from sqlalchemy import select
+
+import config
+from app.auth.models.auth_user import AuthRevokedSession
+from core.common.database import AsyncSessionLocal
+from core.common.loggers import logger
+
+SESSION_REVOKED_CHANNEL = "auth_session_revoked"
+# Seconds between reconnect attempts of the listener.
+SESSION_REVOKED_RECONNECT_DELAY = 5
+SESSION_REVOKED_PRUNE_INTERVAL = datetime.timedelta(minutes=1)
+
+
+class SessionRevocationSet:
+    """
+    Revoked session ids with the expiry of their last access token. Loaded at
+    startup and kept in sync across workers through Postgres LISTEN/NOTIFY, so
+    checking an access token is a dict lookup.
+    """
+
+    def __init__(self):
+        self._revoked: dict[str, datetime.datetime] = {}
+        self._pruned_at = datetime.datetime.now()
+        self._connection = None
+        self._reconnect_task = None
+
+    def __contains__(self, session_id: str) -> bool:
+        now = datetime.datetime.now()
+        self._prune(now)
+        expires_at = self._revoked.get(session_id)
+        return expires_at is not None and expires_at > now
+
+    def add(self, session_id: str, expires_at: datetime.datetime):
+        self._revoked[session_id] = expires_at
+        self._prune(datetime.datetime.now())
+
+    def _prune(self, now: datetime.datetime):
+        if now - self._pruned_at > SESSION_REVOKED_PRUNE_INTERVAL:
+            # Past the expiry the token is rejected by its own exp claim.
+            self._revoked = {
+                key: value for key, value in self._revoked.items() if value > now
+            }
+            self._pruned_at = now
+
+    async def start(self):
+        # Listen first, then load: a revocation committed in between is at
+        # worst received twice.
+        self._connection = await asyncpg.connect(config.DATABASE_CONN_URL)
+        self._connection.add_termination_listener(self._on_termination)
+        await self._connection.add_listener(SESSION_REVOKED_CHANNEL, self._on_notify)
+        await self.load()
+
+    async def stop(self):
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._connection and not self._connection.is_closed():
+            self._connection.remove_termination_listener(self._on_termination)
+            await self._connection.close()
+
+    async def load(self):
+        async with AsyncSessionLocal() as db_session:
+            query = select(
+                AuthRevokedSession.session_id, AuthRevokedSession.expires_at
+            ).where(AuthRevokedSession.expires_at > datetime.datetime.now())
+            result = await db_session.execute(query)
+            for session_id, expires_at in result:
+                self.add(str(session_id), expires_at)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        session_id, expires_at = payload.split("|")
+        self.add(session_id, datetime.datetime.fromisoformat(expires_at))
+
+    def _on_termination(self, connection):
+        logger.warning("Session revocation listener lost its connection")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        # Revocations sent while disconnected are picked up by the reload.
+        while True:
+            await asyncio.sleep(SESSION_REVOKED_RECONNECT_DELAY)
+            try:
+                await self.start()
+                return
+            except Exception as ex:
+                logger.warning(f"Session revocation listener reconnect failed: {ex}")
+
+
+session_revocations = SessionRevocationSet()
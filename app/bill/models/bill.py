@@ -1,24 +1,65 @@
+from datetime import datetime
+
 from sqlalchemy import (
     String,
     Column,
+    Computed,
     Text,
     DateTime,
-    ForeignKey,
+    ForeignKeyConstraint,
     Numeric,
     SmallInteger,
     Boolean,
     Integer,
+    Index,
+    Uuid,
+    text,
 )
+from sqlalchemy.orm import relationship
 
 from app.common.constants import BillType, BillShareType, BillStatus
 from core.common.constants import Role
 from core.models import BillFasterBaseModel
 
 
+# The bill tables are range partitioned by month on the bill creation time.
+# Postgres needs the partition key in every primary key and unique index, so
+# items and participants carry their bill's created_at as bill_created_at and
+# live in the same month as their bill.
 class Bill(BillFasterBaseModel):
     __tablename__ = "t_bills"
+    __table_args__ = (
+        Index("ix_t_bills_bill_key", "bill_key", "created_at", unique=True),
+        # Only bills issued before bill_key are looked up by bill_number, new
+        # rows add no entry to this index.
+        Index(
+            "ix_t_bills_bill_number",
+            "bill_number",
+            postgresql_where=text("bill_key IS NULL"),
+        ),
+        Index(
+            "ix_t_bills_created_by_created_at_id",
+            "created_by",
+            "created_at",
+            "id",
+            postgresql_include=[
+                "bill_number",
+                "type",
+                "share_type",
+                "status",
+                "total",
+                "currency",
+                "number_people",
+                "payment_flag",
+            ],
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    bill_number = Column(String(length=100), unique=True, nullable=False, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.now)
+    bill_number = Column(String(length=100), nullable=False)
+    bill_key = Column(Uuid, nullable=True)
     bill_file_id = Column(Integer, nullable=True)
 
     type = Column(SmallInteger, nullable=False, default=BillType.SIMPLE)
@@ -28,6 +69,9 @@ class Bill(BillFasterBaseModel):
     tax_flag = Column(Boolean, nullable=False, default=False)
     tax_percent = Column(Numeric(5, 2), nullable=True)
     tax_amount = Column(Numeric(16, 2), nullable=True)
+    service_flag = Column(Boolean, nullable=False, default=False)
+    service_percent = Column(Numeric(5, 2), nullable=True)
+    service_amount = Column(Numeric(16, 2), nullable=True)
     tip_flag = Column(Boolean, nullable=False, default=False)
     tip_percent = Column(Numeric(5, 2), nullable=True)
     tip_amount = Column(Numeric(16, 2), nullable=True)
@@ -40,11 +84,38 @@ class Bill(BillFasterBaseModel):
     payment_note = Column(Text, nullable=True)
     payment_file_id = Column(Integer, nullable=True)
 
+    bill_file = relationship(
+        "FileSystem",
+        primaryjoin="foreign(Bill.bill_file_id) == FileSystem.id",
+        viewonly=True,
+        lazy="raise",
+    )
+    payment_file = relationship(
+        "FileSystem",
+        primaryjoin="foreign(Bill.payment_file_id) == FileSystem.id",
+        viewonly=True,
+        lazy="raise",
+    )
+    bill_items = relationship(
+        "BillItem", order_by="BillItem.id", viewonly=True, lazy="raise"
+    )
+    bill_participants = relationship(
+        "BillParticipant", order_by="BillParticipant.id", viewonly=True, lazy="raise"
+    )
+
 
 class BillItem(BillFasterBaseModel):
     __tablename__ = "t_bill_items"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["bill_id", "bill_created_at"], ["t_bills.id", "t_bills.created_at"]
+        ),
+        {"postgresql_partition_by": "RANGE (bill_created_at)"},
+    )
 
-    bill_id = Column(ForeignKey("t_bills.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    bill_created_at = Column(DateTime, primary_key=True)
+    bill_id = Column(Integer, nullable=False, index=True)
     name = Column(String(length=100), nullable=True)
     description = Column(String(length=255), nullable=True)
     quantity = Column(Numeric(10, 2), nullable=True, default=1)
@@ -54,11 +125,36 @@ class BillItem(BillFasterBaseModel):
 
 class BillParticipant(BillFasterBaseModel):
     __tablename__ = "t_bill_participants"
+    __table_args__ = (
+        # Serves the participant probes (email, bill) and lists a user's bills
+        # newest first straight from the index.
+        Index(
+            "ix_t_bill_participants_email_normalized_bill_created_at_bill_id",
+            "email_normalized",
+            "bill_created_at",
+            "bill_id",
+        ),
+        ForeignKeyConstraint(
+            ["bill_id", "bill_created_at"], ["t_bills.id", "t_bills.created_at"]
+        ),
+        ForeignKeyConstraint(
+            ["bill_item_id", "bill_created_at"],
+            ["t_bill_items.id", "t_bill_items.bill_created_at"],
+        ),
+        {"postgresql_partition_by": "RANGE (bill_created_at)"},
+    )
 
-    bill_id = Column(ForeignKey("t_bills.id"), nullable=False, index=True)
-    bill_item_id = Column(ForeignKey("t_bill_items.id"), nullable=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    bill_created_at = Column(DateTime, primary_key=True)
+    bill_id = Column(Integer, nullable=False, index=True)
+    bill_item_id = Column(Integer, nullable=True, index=True)
     name = Column(String(length=100), nullable=True)
     amount = Column(Numeric(16, 2), nullable=False)
     email = Column(String(length=255), nullable=True)
+    # Generated by the database so that every write path, bulk ones included,
+    # keeps it in sync with email.
+    email_normalized = Column(
+        String(length=255), Computed("lower(trim(email))", persisted=True)
+    )
     description = Column(String(length=255), nullable=True)
     payment_flag = Column(Boolean, nullable=False, default=False)
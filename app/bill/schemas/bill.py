@@ -1,19 +1,25 @@
 from datetime import datetime
 from decimal import Decimal
+from typing import Annotated
 
-from pydantic import Field, BaseModel, ConfigDict
+from pydantic import Field, BaseModel, ConfigDict, field_validator
 
-from app.common.constants import BillType, BillShareType
+from app.common.constants import BillType, BillShareType, BillStatus
+
+BILL_ITEM_WEIGHT_MAX = 10**6
 
 
 class BillParticipantCrUpSchema(BaseModel):
+    id: int | None = Field(default=None)
     name: str | None = Field(default=None, max_length=100)
     amount: Decimal = Field(...)
     email: str | None = Field(default=None)
     description: str | None = Field(default=None)
+    payment_flag: bool = Field(default=False)
 
 
 class BillItemCrUpSchema(BaseModel):
+    id: int | None = Field(default=None)
     name: str | None = Field(default=None, max_length=100)
     description: str | None = Field(default=None, max_length=255)
     quantity: Decimal = Field(default=1, ge=0)
@@ -31,6 +37,10 @@ class BillCrUpSchema(BaseModel):
     tax_percent: Decimal | None = Field(default=None)
     tax_amount: Decimal | None = Field(default=None)
 
+    service_flag: bool = Field(default=False)
+    service_percent: Decimal | None = Field(default=None)
+    service_amount: Decimal | None = Field(default=None)
+
     tip_flag: bool = Field(default=False)
     tip_percent: Decimal | None = Field(default=None)
     tip_amount: Decimal | None = Field(default=None)
@@ -47,10 +57,57 @@ class BillCrUpSchema(BaseModel):
     bill_participants: list[BillParticipantCrUpSchema] = Field(default_factory=list)
 
 
+class BillComputeItemSchema(BaseModel):
+    total: Decimal = Field(..., ge=0)
+    # One weight per participant, an empty list shares the item equally.
+    # Weights are only proportions, floats parse far faster than Decimals.
+    weights: list[
+        Annotated[float, Field(ge=0, le=BILL_ITEM_WEIGHT_MAX, allow_inf_nan=False)]
+    ] = Field(default_factory=list)
+
+    @field_validator("weights")
+    @classmethod
+    def check_weights(cls, weights: list[float]) -> list[float]:
+        if weights and not any(weights):
+            raise ValueError("Item weights must not all be zero")
+        return weights
+
+
+class BillComputeSchema(BaseModel):
+    type: BillType = Field(default=BillType.SIMPLE)
+    subtotal: Decimal | None = Field(default=None, ge=0)
+
+    tax_flag: bool = Field(default=False)
+    tax_percent: Decimal | None = Field(default=None, ge=0)
+    tax_amount: Decimal | None = Field(default=None, ge=0)
+
+    service_flag: bool = Field(default=False)
+    service_percent: Decimal | None = Field(default=None, ge=0)
+    service_amount: Decimal | None = Field(default=None, ge=0)
+
+    tip_flag: bool = Field(default=False)
+    tip_percent: Decimal | None = Field(default=None, ge=0)
+    tip_amount: Decimal | None = Field(default=None, ge=0)
+
+    currency: str = Field(default="USD")
+    number_people: int = Field(..., ge=1)
+    bill_items: list[BillComputeItemSchema] = Field(default_factory=list)
+
+
+class BillSettleSchema(BaseModel):
+    bill_numbers: list[str] = Field(..., min_length=1)
+
+
+class BillParticipantPaymentSchema(BaseModel):
+    participant_ids: list[int] = Field(..., min_length=1)
+    payment_flag: bool = Field(...)
+
+
 class BillParticipantDetailSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
-    name : str | None = Field(default=None, max_length=100)
+    id: int | None = Field(default=None)
+    name: str | None = Field(default=None, max_length=100)
     amount: Decimal = Field(...)
     email: str | None = Field(default=None)
     description: str | None = Field(default=None)
@@ -60,6 +117,7 @@ class BillParticipantDetailSchema(BaseModel):
 class BillItemDetailSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
+    id: int | None = Field(default=None)
     name: str | None = Field(default=None, max_length=100)
     description: str | None = Field(default=None, max_length=255)
     quantity: Decimal = Field(default=1, ge=0)
@@ -71,6 +129,8 @@ class BillDetailSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     bill_file_url: str | None = Field(default=None)
+    bill_file_thumbnail_url: str | None = Field(default=None)
+    bill_file_medium_url: str | None = Field(default=None)
     type: BillType = Field(...)
     share_type: BillShareType = Field(...)
     subtotal: Decimal = Field(...)
@@ -79,6 +139,10 @@ class BillDetailSchema(BaseModel):
     tax_percent: Decimal | None = Field(default=None)
     tax_amount: Decimal | None = Field(default=None)
 
+    service_flag: bool = Field(default=False)
+    service_percent: Decimal | None = Field(default=None)
+    service_amount: Decimal | None = Field(default=None)
+
     tip_flag: bool = Field(default=False)
     tip_percent: Decimal | None = Field(default=None)
     tip_amount: Decimal | None = Field(default=None)
@@ -95,3 +159,23 @@ class BillDetailSchema(BaseModel):
     bill_participants: list[BillParticipantDetailSchema] = Field(default_factory=list)
     created_at: datetime = Field(...)
     created_by: str | None = Field(default=None)
+
+
+class BillSummarySchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bill_number: str = Field(...)
+    type: BillType = Field(...)
+    share_type: BillShareType = Field(...)
+    status: BillStatus = Field(...)
+    total: Decimal = Field(...)
+    currency: str = Field(default="USD")
+    number_people: int = Field(..., ge=1)
+    payment_flag: bool = Field(default=False)
+    created_at: datetime = Field(...)
+    created_by: str | None = Field(default=None)
+
+
+class BillExportSchema(BillDetailSchema):
+    bill_number: str = Field(...)
+    status: BillStatus = Field(...)
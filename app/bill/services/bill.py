@@ -1,12 +1,62 @@
+import base64
+import csv
 import datetime
-import uuid
+import hashlib
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal
+from http import HTTPStatus
 
-from sqlalchemy import Delete, Select
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import (
+    Delete,
+    Insert,
+    Integer,
+    Select,
+    Text,
+    Update,
+    any_,
+    and_,
+    cast,
+    exists,
+    func,
+    literal,
+    literal_column,
+    or_,
+    tuple_,
+    union,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
+import config
 from app.auth.models import User
 from app.bill.models import Bill, BillItem, BillParticipant
-from app.bill.schemas.bill import BillCrUpSchema, BillItemCrUpSchema, BillDetailSchema
-from app.common.constants import BillShareType
+from app.bill.schemas.bill import (
+    BillCrUpSchema,
+    BillItemCrUpSchema,
+    BillParticipantCrUpSchema,
+    BillDetailSchema,
+    BillExportSchema,
+    BillSummarySchema,
+)
+from app.bill.services.cache import bill_detail_cache, PER_REQUEST_FIELDS
+from app.bill.services.settlement import settle_balances
+from app.bill.services.split import (
+    from_minor_units,
+    get_currency_decimals,
+    to_minor_units,
+    validate_bill_totals,
+)
+from app.common.constants import (
+    BillExportFormat,
+    BillShareType,
+    BillStatus,
+    FileVariant,
+)
+from app.file.models import FileSystem
 from app.file.services.file import FileService
 from core.common.exceptions import (
     BillFasterBadRequestException,
@@ -14,76 +64,291 @@ from core.common.exceptions import (
     BillFasterBaseException,
 )
 from core.services.base import BillFasterBaseService
+from core.utils.email import normalize_email
+from core.utils.identifier import (
+    encode_base62,
+    generate_ulid,
+    get_ulid_datetime,
+    parse_ulid,
+)
+from core.utils.merge_patch import apply_merge_patch
+
+BILL_COLLECTION_FIELDS = {"bill_items", "bill_participants"}
+# New bills take their created_at from the bill_key timestamp, the window only
+# absorbs clock and timezone differences between app servers.
+BILL_KEY_CREATED_AT_WINDOW = datetime.timedelta(days=1)
+# A presigned URL handed out from the URL cache stays valid at least this long,
+# responses embedding one must not be cached for longer.
+BILL_FINALIZED_MAX_AGE = min(
+    config.BILL_FINALIZED_CACHE_MAX_AGE,
+    config.AWS_S3_PRESIGNED_URL_EXPIRES - config.AWS_S3_PRESIGNED_URL_CACHE_TTL,
+)
+
+EXPORT_CSV_COLUMNS = [
+    "bill_number",
+    "bill_type",
+    "bill_status",
+    "currency",
+    "bill_total",
+    "bill_created_at",
+    "record_type",
+    "name",
+    "description",
+    "quantity",
+    "unit_price",
+    "amount",
+    "email",
+    "payment_flag",
+]
 
 
 class BillService(BillFasterBaseService):
+    @staticmethod
+    def _bill_number_clause(bill_number: str):
+        # Compact ids resolve through the fixed-width bill_key index, share links
+        # issued before them still resolve through bill_number.
+        bill_key = parse_ulid(bill_number)
+        if bill_key:
+            # The key's timestamp bounds created_at, so the lookup is pruned to
+            # the partition of the bill.
+            created_at = get_ulid_datetime(bill_key)
+            return and_(
+                Bill.bill_key == bill_key,
+                Bill.created_at.between(
+                    created_at - BILL_KEY_CREATED_AT_WINDOW,
+                    created_at + BILL_KEY_CREATED_AT_WINDOW,
+                ),
+            )
+        # The bill_key condition matches the partial ix_t_bills_bill_number.
+        return and_(Bill.bill_key.is_(None), Bill.bill_number == bill_number)
+
+    @staticmethod
+    def _bill_numbers_clause(bill_numbers: list[str]):
+        bill_keys, legacy_bill_numbers = [], []
+        for bill_number in bill_numbers:
+            bill_key = parse_ulid(bill_number)
+            if bill_key:
+                bill_keys.append(bill_key)
+            else:
+                legacy_bill_numbers.append(bill_number)
+        clauses = []
+        if bill_keys:
+            created_ats = [get_ulid_datetime(bill_key) for bill_key in bill_keys]
+            clauses.append(
+                and_(
+                    Bill.bill_key.in_(bill_keys),
+                    Bill.created_at.between(
+                        min(created_ats) - BILL_KEY_CREATED_AT_WINDOW,
+                        max(created_ats) + BILL_KEY_CREATED_AT_WINDOW,
+                    ),
+                )
+            )
+        if legacy_bill_numbers:
+            clauses.append(
+                and_(Bill.bill_key.is_(None), Bill.bill_number.in_(legacy_bill_numbers))
+            )
+        return or_(*clauses)
+
     async def _get_bill_by_bill_number(self, bill_number: str):
-        query = Select(Bill).where(Bill.bill_number == bill_number)
+        query = Select(Bill).where(self._bill_number_clause(bill_number))
         result = await self.db_session.execute(query)
         return result.scalars().one_or_none()
 
-    async def _get_bill_items(self, bill_id: int):
-        query = Select(BillItem).where(BillItem.bill_id == bill_id)
+    async def _get_bill_with_files_by_bill_number(
+        self, bill_number: str, participant_email: str | None = None
+    ) -> tuple[Bill | None, bool]:
+        """
+        The bill with its files and, given an email, whether that email is
+        one of its participants, in one statement.
+        """
+        is_participant = (
+            self._participant_email_clause(Bill, participant_email)
+            if participant_email
+            else literal(False)
+        )
+        query = (
+            Select(Bill, is_participant)
+            .where(self._bill_number_clause(bill_number))
+            .options(joinedload(Bill.bill_file), joinedload(Bill.payment_file))
+        )
+        result = await self.db_session.execute(query)
+        return result.one_or_none() or (None, False)
+
+    @staticmethod
+    def _bill_children_clause(model, bill):
+        # bill_created_at prunes the children to the partition of the bill.
+        return and_(model.bill_id == bill.id, model.bill_created_at == bill.created_at)
+
+    async def _get_bill_items(self, bill: Bill):
+        query = (
+            Select(BillItem)
+            .where(self._bill_children_clause(BillItem, bill))
+            .order_by(BillItem.id)
+        )
         result = await self.db_session.execute(query)
         return result.scalars().all()
 
-    async def _get_bill_participants(self, bill_id: int):
-        query = Select(BillParticipant).where(BillParticipant.bill_id == bill_id)
+    async def _get_bill_participants(self, bill: Bill):
+        query = (
+            Select(BillParticipant)
+            .where(self._bill_children_clause(BillParticipant, bill))
+            .order_by(BillParticipant.id)
+        )
         result = await self.db_session.execute(query)
         return result.scalars().all()
 
-    async def _create_or_update_bill_items(
-        self, bill_id, bill_items: list[BillItemCrUpSchema]
+    async def _get_bill_children_rows(self, bill: Bill) -> tuple[list, list]:
+        """
+        Items and participants of the bill in one round trip, each aggregated
+        to a JSON array in id order. Numbers are read back as Decimal.
+        """
+
+        def get_rows(model):
+            rows = func.json_agg(
+                aggregate_order_by(literal_column(model.__tablename__), model.id)
+            )
+            return (
+                Select(cast(func.coalesce(rows, literal_column("'[]'::json")), Text))
+                .where(self._bill_children_clause(model, bill))
+                .scalar_subquery()
+            )
+
+        query = Select(get_rows(BillItem), get_rows(BillParticipant))
+        result = await self.db_session.execute(query)
+        return tuple(json.loads(rows, parse_float=Decimal) for rows in result.one())
+
+    def _make_file_urls(self, bill: Bill) -> dict:
+        file_urls = {
+            "bill_file_url": None,
+            "bill_file_thumbnail_url": None,
+            "bill_file_medium_url": None,
+            "payment_file_url": None,
+        }
+        file_service = FileService(self.db_session)
+        if file_url := file_service.make_url(bill.bill_file):
+            file_urls["bill_file_url"] = file_url.get("file_url")
+            for variant in (FileVariant.THUMBNAIL, FileVariant.MEDIUM):
+                file_url = file_service.make_url(bill.bill_file, variant)
+                file_urls[f"bill_file_{variant.value}_url"] = file_url.get("file_url")
+
+        if file_url := file_service.make_url(bill.payment_file):
+            file_urls["payment_file_url"] = file_url.get("file_url")
+
+        return file_urls
+
+    async def _get_bill_detail(self, bill: Bill, file_urls: dict) -> dict:
+        detail = await bill_detail_cache.get(bill)
+        if detail is None:
+            bill_items, bill_participants = await self._get_bill_children_rows(bill)
+            children = {
+                "bill_items": bill_items,
+                "bill_participants": bill_participants,
+            }
+            bill_fields = BillDetailSchema.model_fields.keys() - PER_REQUEST_FIELDS
+            detail_schema = BillDetailSchema.model_validate(
+                {
+                    **{
+                        field: getattr(bill, field)
+                        for field in bill_fields - children.keys()
+                    },
+                    **children,
+                }
+            )
+            await bill_detail_cache.set(bill, detail_schema)
+            detail = detail_schema.model_dump(exclude=PER_REQUEST_FIELDS)
+
+        return {**detail, **file_urls}
+
+    async def _reconcile_bill_rows(self, model, bill: Bill, rows: list[BaseModel]):
+        # Match incoming rows to stored ones by id so that only changed rows are
+        # written: one executemany UPDATE, one multi-row INSERT, one DELETE.
+        query = Select(model.__table__).where(self._bill_children_clause(model, bill))
+        result = await self.db_session.execute(query)
+        existing_rows = {row["id"]: row for row in result.mappings()}
+
+        new_rows, changed_rows = [], []
+        for row in rows:
+            data_fields = row.model_dump(exclude={"id"})
+            existing_row = existing_rows.pop(row.id, None) if row.id else None
+            if existing_row is None:
+                new_rows.append(data_fields)
+                continue
+
+            changes = {
+                key: value
+                for key, value in data_fields.items()
+                if existing_row[key] != value
+            }
+            if changes:
+                changes["id"] = row.id
+                changed_rows.append(changes)
+
+        await self._write_bill_rows(
+            model, bill, existing_rows.keys(), changed_rows, new_rows
+        )
+
+    async def _write_bill_rows(
+        self,
+        model,
+        bill: Bill,
+        deleted_ids,
+        changed_rows: list[dict],
+        new_rows: list[dict],
     ):
-        delete_query = Delete(BillItem).where(BillItem.bill_id == bill_id)
-        await self.db_session.execute(delete_query)
-        items = []
-        for item in bill_items:
-            data_fields = item.model_dump()
-            data_fields["bill_id"] = bill_id
-            new_bill_item = BillItem(**data_fields)
-            items.append(new_bill_item)
+        if deleted_ids:
+            delete_query = Delete(model).where(
+                model.id.in_(deleted_ids), model.bill_created_at == bill.created_at
+            )
+            await self.db_session.execute(delete_query)
+        if changed_rows:
+            changed_rows = [
+                {**row, "bill_created_at": bill.created_at} for row in changed_rows
+            ]
+            await self.db_session.execute(Update(model), changed_rows)
+        if new_rows:
+            new_rows = [
+                {**row, "bill_id": bill.id, "bill_created_at": bill.created_at}
+                for row in new_rows
+            ]
+            await self.db_session.execute(Insert(model), new_rows)
 
-        self.db_session.add_all(items)
+    async def _create_or_update_bill_items(
+        self, bill: Bill, bill_items: list[BillItemCrUpSchema]
+    ):
+        await self._reconcile_bill_rows(BillItem, bill, bill_items)
 
     async def _create_or_update_bill_participants(
-        self, bill_id, bill_participants: list
+        self, bill: Bill, bill_participants: list
     ):
-        delete_query = Delete(BillParticipant).where(BillParticipant.bill_id == bill_id)
-        await self.db_session.execute(delete_query)
-        participants = []
-        for participant in bill_participants:
-            data_fields = participant.model_dump()
-            data_fields["bill_id"] = bill_id
-            new_bill_participant = BillParticipant(**data_fields)
-            participants.append(new_bill_participant)
+        await self._reconcile_bill_rows(BillParticipant, bill, bill_participants)
 
-        self.db_session.add_all(participants)
+    @staticmethod
+    def _make_bill_fields(user: dict | None, create_schema: BillCrUpSchema) -> dict:
+        if create_schema.share_type == BillShareType.PRIVATE and not user:
+            raise BillFasterBadRequestException(
+                message="User must be authenticated for private bills"
+            )
+
+        validate_bill_totals(create_schema)
+        data_fields = create_schema.model_dump(
+            exclude={"bill_items", "bill_participants"}
+        )
+        bill_key = generate_ulid()
+        data_fields["bill_key"] = bill_key
+        data_fields["bill_number"] = encode_base62(bill_key.int)
+        data_fields["created_at"] = get_ulid_datetime(bill_key)
+        data_fields["created_by"] = user["user_id"] if user else None
+        return data_fields
 
     async def create(self, user: dict | None, create_schema: BillCrUpSchema):
         try:
-            if create_schema.share_type == BillShareType.PRIVATE and not user:
-                raise BillFasterBadRequestException(
-                    message="User must be authenticated for private bills"
-                )
-
-            data_fields = create_schema.model_dump(
-                exclude={"bill_items", "bill_participants"}
-            )
-            data_fields["bill_number"] = (
-                f"BF{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4())}".replace(
-                    "-", ""
-                )
-            )
-            data_fields["created_by"] = user['user_id'] if user else None
+            data_fields = self._make_bill_fields(user, create_schema)
             new_bill = Bill(**data_fields)
             self.db_session.add(new_bill)
             await self.db_session.flush()
-            await self._create_or_update_bill_items(
-                new_bill.id, create_schema.bill_items
-            )
+            await self._create_or_update_bill_items(new_bill, create_schema.bill_items)
             await self._create_or_update_bill_participants(
-                new_bill.id, create_schema.bill_participants
+                new_bill, create_schema.bill_participants
             )
             await self.db_session.commit()
             await self.db_session.refresh(new_bill)
@@ -96,6 +361,60 @@ class BillService(BillFasterBaseService):
         except Exception as e:
             raise BillFasterBadRequestException()
 
+    async def batch_create(
+        self, user: dict | None, create_schemas: list[BillCrUpSchema]
+    ) -> list[dict]:
+        if len(create_schemas) > config.BILL_BATCH_CREATE_MAX_SIZE:
+            raise BillFasterBadRequestException(
+                message=f"A batch can create at most "
+                f"{config.BILL_BATCH_CREATE_MAX_SIZE} bills"
+            )
+
+        results, bill_rows, valid_schemas = [], [], []
+        for create_schema in create_schemas:
+            try:
+                data_fields = self._make_bill_fields(user, create_schema)
+            except BillFasterBaseException as ex:
+                results.append({"bill_number": None, "errors": [ex.message]})
+                continue
+
+            bill_rows.append(data_fields)
+            valid_schemas.append(create_schema)
+            results.append({"bill_number": data_fields["bill_number"], "errors": []})
+
+        if not bill_rows:
+            return results
+
+        try:
+            # One INSERT ... RETURNING for the bills, then one bulk INSERT each for
+            # items and participants, all in a single transaction.
+            insert_query = Insert(Bill).returning(Bill.id, Bill.bill_number)
+            result = await self.db_session.execute(insert_query, bill_rows)
+            bill_ids = {row.bill_number: row.id for row in result}
+
+            item_rows, participant_rows = [], []
+            for data_fields, create_schema in zip(bill_rows, valid_schemas):
+                bill_fields = {
+                    "bill_id": bill_ids[data_fields["bill_number"]],
+                    "bill_created_at": data_fields["created_at"],
+                }
+                for item in create_schema.bill_items:
+                    item_rows.append({**item.model_dump(exclude={"id"}), **bill_fields})
+                for participant in create_schema.bill_participants:
+                    participant_rows.append(
+                        {**participant.model_dump(exclude={"id"}), **bill_fields}
+                    )
+
+            if item_rows:
+                await self.db_session.execute(Insert(BillItem), item_rows)
+            if participant_rows:
+                await self.db_session.execute(Insert(BillParticipant), participant_rows)
+            await self.db_session.commit()
+            return results
+        except Exception as e:
+            await self.db_session.rollback()
+            raise BillFasterBadRequestException()
+
     async def update(
         self, user: dict | None, bill_number: str, update_schema: BillCrUpSchema
     ):
@@ -108,6 +427,8 @@ class BillService(BillFasterBaseService):
                     message="User must be authenticated for private bills"
                 )
 
+            validate_bill_totals(update_schema)
+            await bill_detail_cache.invalidate(bill)
             data_fields = update_schema.model_dump(
                 exclude={"bill_items", "bill_participants", "bill_number"}
             )
@@ -117,12 +438,171 @@ class BillService(BillFasterBaseService):
             setattr(
                 bill,
                 "created_by",
-                user['user_id'] if user and not bill.created_by else bill.created_by,
+                user["user_id"] if user and not bill.created_by else bill.created_by,
             )
-            setattr(bill, "updated_by", user['user_id'] if user else None)
-            await self._create_or_update_bill_items(bill.id, update_schema.bill_items)
+            setattr(bill, "updated_by", user["user_id"] if user else None)
+            # updated_at versions the cached detail, bump it even when only
+            # items or participants change.
+            setattr(bill, "updated_at", datetime.datetime.now())
+            await self._create_or_update_bill_items(bill, update_schema.bill_items)
             await self._create_or_update_bill_participants(
-                bill.id, update_schema.bill_participants
+                bill, update_schema.bill_participants
+            )
+            await self.db_session.commit()
+            return {
+                "bill_number": bill_number,
+            }
+        except BillFasterBaseException as ex:
+            raise ex
+        except Exception as e:
+            raise BillFasterBadRequestException()
+
+    @staticmethod
+    def _merge_bill_rows(
+        schema, rows: list, rows_patch: dict | None
+    ) -> tuple[list[BaseModel], list[int], list[dict], list[dict]]:
+        """
+        Apply a merge patch to a sub-collection seen as an object keyed by row
+        id: a null member deletes the row, an object patches it and a key that
+        is not a stored id adds a new row.
+        """
+        if rows_patch is not None and not isinstance(rows_patch, dict):
+            raise BillFasterBadRequestException(
+                message="Bill items and participants must be patched by id"
+            )
+
+        current_rows = {
+            str(row.id): schema.model_validate(row, from_attributes=True).model_dump(
+                exclude={"id"}
+            )
+            for row in rows
+        }
+        merged_rows = apply_merge_patch(current_rows, rows_patch or {})
+
+        patched_rows, deleted_ids, changed_rows, new_rows = [], [], [], []
+        for key in current_rows:
+            if key not in merged_rows:
+                deleted_ids.append(int(key))
+        for key, merged_row in merged_rows.items():
+            if not isinstance(merged_row, dict):
+                raise BillFasterBadRequestException(
+                    message="Bill items and participants must be objects"
+                )
+            patched_row = schema(**merged_row)
+            data_fields = patched_row.model_dump(exclude={"id"})
+            current_row = current_rows.get(key)
+            if current_row is None:
+                new_rows.append(data_fields)
+            else:
+                patched_row.id = int(key)
+                changes = {
+                    field: value
+                    for field, value in data_fields.items()
+                    if current_row[field] != value
+                }
+                if changes:
+                    changed_rows.append({**changes, "id": int(key)})
+            patched_rows.append(patched_row)
+        return patched_rows, deleted_ids, changed_rows, new_rows
+
+    async def patch(self, user: dict | None, bill_number: str, merge_patch: dict):
+        bill = await self._get_bill_by_bill_number(bill_number)
+        if not bill:
+            raise BillFasterNotFoundException()
+        if bill.share_type == BillShareType.PRIVATE and not user:
+            raise BillFasterBadRequestException(
+                message="User must be authenticated for private bills"
+            )
+
+        header_fields = BillCrUpSchema.model_fields.keys() - BILL_COLLECTION_FIELDS
+        header_patch = {
+            key: value
+            for key, value in merge_patch.items()
+            if key not in BILL_COLLECTION_FIELDS
+        }
+        if header_patch.keys() - header_fields:
+            raise BillFasterBadRequestException(
+                message="Bill patch contains unknown fields"
+            )
+
+        try:
+            bill_items, item_deleted_ids, item_changed_rows, item_new_rows = (
+                self._merge_bill_rows(
+                    BillItemCrUpSchema,
+                    await self._get_bill_items(bill),
+                    merge_patch.get("bill_items"),
+                )
+            )
+            (
+                bill_participants,
+                participant_deleted_ids,
+                participant_changed_rows,
+                participant_new_rows,
+            ) = self._merge_bill_rows(
+                BillParticipantCrUpSchema,
+                await self._get_bill_participants(bill),
+                merge_patch.get("bill_participants"),
+            )
+            header = apply_merge_patch(
+                {field: getattr(bill, field) for field in header_fields},
+                header_patch,
+            )
+            patch_schema = BillCrUpSchema(
+                **header,
+                bill_items=bill_items,
+                bill_participants=bill_participants,
+            )
+        except ValidationError as e:
+            raise BillFasterBadRequestException(message="Bill patch is invalid")
+
+        try:
+            if patch_schema.share_type == BillShareType.PRIVATE and not user:
+                raise BillFasterBadRequestException(
+                    message="User must be authenticated for private bills"
+                )
+            validate_bill_totals(patch_schema)
+
+            data_fields = patch_schema.model_dump(exclude=BILL_COLLECTION_FIELDS)
+            changes = {
+                field: data_fields[field]
+                for field in header_patch
+                if getattr(bill, field) != data_fields[field]
+            }
+            await bill_detail_cache.invalidate(bill)
+            # Everything is validated before the first write, and the header
+            # update doubles as an optimistic version check, so the bill row is
+            # only locked for the few statements below.
+            query = (
+                Update(Bill)
+                .where(
+                    Bill.id == bill.id,
+                    Bill.created_at == bill.created_at,
+                    Bill.updated_at.is_not_distinct_from(bill.updated_at),
+                )
+                .values(
+                    **changes,
+                    updated_at=datetime.datetime.now(),
+                    updated_by=user["user_id"] if user else None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            result = await self.db_session.execute(query)
+            if not result.rowcount:
+                await self.db_session.rollback()
+                raise BillFasterBadRequestException(
+                    status_code=HTTPStatus.CONFLICT,
+                    message="Bill was modified concurrently, please retry",
+                )
+
+            await self._write_bill_rows(
+                BillItem, bill, item_deleted_ids, item_changed_rows, item_new_rows
+            )
+            await self._write_bill_rows(
+                BillParticipant,
+                bill,
+                participant_deleted_ids,
+                participant_changed_rows,
+                participant_new_rows,
             )
             await self.db_session.commit()
             return {
@@ -133,68 +613,445 @@ class BillService(BillFasterBaseService):
         except Exception as e:
             raise BillFasterBadRequestException()
 
-    async def get_by_bill_number(self, user, bill_number: str) -> dict:
+    async def update_participant_payment(
+        self,
+        user: dict | None,
+        bill_number: str,
+        participant_ids: list[int],
+        payment_flag: bool,
+    ) -> dict:
+        bill = await self._get_bill_by_bill_number(bill_number)
+        if not bill:
+            raise BillFasterNotFoundException()
+        if bill.share_type == BillShareType.PRIVATE and not user:
+            raise BillFasterBadRequestException(
+                message="User must be authenticated for private bills"
+            )
+
         try:
-            bill = await self._get_bill_by_bill_number(bill_number)
-            if not bill or (bill.share_type == BillShareType.PRIVATE and not user):
-                raise BillFasterNotFoundException()
-
-            bill_items = await self._get_bill_items(bill.id)
-            setattr(bill, "bill_items", bill_items)
-            bill_participants = await self._get_bill_participants(bill.id)
-            setattr(bill, "bill_participants", bill_participants)
-
-            result = BillDetailSchema.model_validate(bill).model_dump()
-            file_service = FileService(self.db_session)
-            if bill.bill_file_id:
-                file_url = await file_service.get_url(bill.bill_file_id)
-                result["bill_file_url"] = file_url.get("file_url")
-
-            if bill.payment_file_id:
-                file_url = await file_service.get_url(bill.payment_file_id)
-                result["payment_file_url"] = file_url.get("file_url")
-
-            return result
+            await bill_detail_cache.invalidate(bill)
+            updated_by = user["user_id"] if user else None
+            now = datetime.datetime.now()
+            participants = BillParticipant.__table__
+            bills = Bill.__table__
+
+            updated = (
+                Update(participants)
+                .where(
+                    participants.c.bill_id == bill.id,
+                    participants.c.bill_created_at == bill.created_at,
+                    participants.c.id == any_(literal(participant_ids, ARRAY(Integer))),
+                )
+                .values(
+                    payment_flag=payment_flag, updated_at=now, updated_by=updated_by
+                )
+                .returning(participants.c.id)
+                .cte("updated_participants")
+            )
+            # The outer statement still sees the participants as they were
+            # before the CTE ran, so the updated rows are accounted for apart.
+            has_unpaid = exists().where(
+                participants.c.bill_id == bill.id,
+                participants.c.bill_created_at == bill.created_at,
+                participants.c.payment_flag.is_not(True),
+                participants.c.id.not_in(Select(updated.c.id)),
+            )
+            bill_payment_flag = ~has_unpaid
+            if not payment_flag:
+                bill_payment_flag = and_(~has_unpaid, ~exists(Select(updated.c.id)))
+
+            query = (
+                Update(bills)
+                .where(bills.c.id == bill.id, bills.c.created_at == bill.created_at)
+                .values(
+                    payment_flag=bill_payment_flag,
+                    updated_at=now,
+                    updated_by=updated_by,
+                )
+                .returning(
+                    bills.c.payment_flag,
+                    Select(func.count()).select_from(updated).scalar_subquery(),
+                )
+                .add_cte(updated)
+            )
+            bill_payment_flag, updated_count = (
+                await self.db_session.execute(query)
+            ).one()
+            if updated_count != len(set(participant_ids)):
+                await self.db_session.rollback()
+                raise BillFasterNotFoundException(
+                    message="Participant does not belong to the bill"
+                )
+
+            await self.db_session.commit()
+            return {
+                "bill_number": bill_number,
+                "payment_flag": bill_payment_flag,
+            }
         except BillFasterBaseException as ex:
             raise ex
         except Exception as e:
             raise BillFasterBadRequestException()
 
-    async def get_shared_by_bill_number(self, user, bill_number: str) -> dict:
+    @staticmethod
+    def _participant_email_clause(bill, email: str):
+        # Probes ix_t_bill_participants_email_normalized_bill_id only, the
+        # participants of the bill are never loaded.
+        participant = aliased(BillParticipant)
+        return exists().where(
+            participant.email_normalized == normalize_email(email),
+            participant.bill_id == bill.id,
+            participant.bill_created_at == bill.created_at,
+        )
+
+    async def _get_readable_bill(self, user, bill_number: str, shared: bool) -> Bill:
+        # The participant probe only matters for private bills read as shared.
+        participant_email = user["email"] if shared and user else None
+        bill, is_participant = await self._get_bill_with_files_by_bill_number(
+            bill_number, participant_email
+        )
+        if not bill or (bill.share_type == BillShareType.PRIVATE and not user):
+            raise BillFasterNotFoundException()
+
+        if (
+            shared
+            and bill.share_type == BillShareType.PRIVATE
+            and bill.created_by != user["user_id"]
+            and not is_participant
+        ):
+            raise BillFasterNotFoundException()
+
+        return bill
+
+    @staticmethod
+    def _make_cache_headers(bill: Bill, file_urls: dict) -> dict:
+        # Every write to a bill or its items/participants bumps updated_at, so the
+        # header row versions the cached detail. The signed file URLs version the
+        # rest: they change with the file status, its variants and every new
+        # signature, so a 304 never confirms an expired or missing URL.
+        version = ":".join(
+            [
+                bill.bill_number,
+                bill.updated_at.isoformat() if bill.updated_at else "",
+                str(bill.share_type),
+                *(file_urls[key] or "" for key in sorted(file_urls)),
+            ]
+        )
+        headers = {"ETag": '"%s"' % hashlib.sha1(version.encode()).hexdigest()}
+        if bill.share_type == BillShareType.PRIVATE:
+            headers["Cache-Control"] = "private, no-cache"
+            headers["Vary"] = "Authorization"
+        elif bill.status == BillStatus.FINALIZED:
+            headers["Cache-Control"] = f"public, max-age={BILL_FINALIZED_MAX_AGE}"
+        else:
+            headers["Cache-Control"] = "no-cache"
+        return headers
+
+    @staticmethod
+    def _is_etag_matched(if_none_match: str | None, etag: str) -> bool:
+        if not if_none_match:
+            return False
+
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/")
+            if tag == "*" or tag == etag:
+                return True
+        return False
+
+    async def _get_conditional_bill_detail(
+        self, user, bill_number: str, if_none_match: str | None, shared: bool
+    ) -> tuple[dict | None, dict]:
         try:
-            bill = await self._get_bill_by_bill_number(bill_number)
-            if not bill or (bill.share_type == BillShareType.PRIVATE and not user):
-                raise BillFasterNotFoundException()
-
-            bill_participants = await self._get_bill_participants(bill.id)
-            if (
-                bill.share_type == BillShareType.PRIVATE
-                and user
-                and bill.created_by != user['user_id']
-            ):
-                email_participants = [
-                    participant.email
-                    for participant in bill_participants
-                    if participant.email
-                ]
-                if user['email'] not in email_participants:
-                    raise BillFasterNotFoundException()
-
-            setattr(bill, "bill_participants", bill_participants)
-            bill_items = await self._get_bill_items(bill.id)
-            setattr(bill, "bill_items", bill_items)
-            result = BillDetailSchema.model_validate(bill).model_dump()
-            file_service = FileService(self.db_session)
-            if bill.bill_file_id:
-                file_url = await file_service.get_url(bill.bill_file_id)
-                result["bill_file_url"] = file_url.get("file_url")
-
-            if bill.payment_file_id:
-                file_url = await file_service.get_url(bill.payment_file_id)
-                result["payment_file_url"] = file_url.get("file_url")
-
-            return result
+            bill = await self._get_readable_bill(user, bill_number, shared)
+            file_urls = self._make_file_urls(bill)
+            headers = self._make_cache_headers(bill, file_urls)
+            if self._is_etag_matched(if_none_match, headers["ETag"]):
+                return None, headers
+
+            return await self._get_bill_detail(bill, file_urls), headers
         except BillFasterBaseException as ex:
             raise ex
         except Exception as e:
             raise BillFasterBadRequestException()
+
+    async def get_by_bill_number(
+        self, user, bill_number: str, if_none_match: str | None = None
+    ) -> tuple[dict | None, dict]:
+        return await self._get_conditional_bill_detail(
+            user, bill_number, if_none_match, shared=False
+        )
+
+    async def get_shared_by_bill_number(
+        self, user, bill_number: str, if_none_match: str | None = None
+    ) -> tuple[dict | None, dict]:
+        return await self._get_conditional_bill_detail(
+            user, bill_number, if_none_match, shared=True
+        )
+
+    @staticmethod
+    def _encode_cursor(bill: Bill) -> str:
+        value = f"{bill.created_at.isoformat()}|{bill.id}"
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            created_at, bill_id = value.split("|")
+            return datetime.datetime.fromisoformat(created_at), int(bill_id)
+        except ValueError:
+            raise BillFasterBadRequestException(message="Invalid cursor")
+
+    def _get_participations_page(
+        self, user: dict, cursor: str | None, limit: int, *where
+    ):
+        # One page of the bills the user takes part in, newest first and each
+        # once. It is read in order from
+        # ix_t_bill_participants_email_normalized_bill_created_at_bill_id and
+        # stops after limit + 1 bills, however deep the cursor is.
+        query = (
+            Select(
+                BillParticipant.bill_id.label("id"),
+                BillParticipant.bill_created_at.label("created_at"),
+            )
+            .where(
+                BillParticipant.email_normalized == normalize_email(user["email"]),
+                *where,
+            )
+            .distinct()
+        )
+        if cursor:
+            keyset = tuple_(*self._decode_cursor(cursor))
+            query = query.where(
+                tuple_(BillParticipant.bill_created_at, BillParticipant.bill_id)
+                < keyset
+            )
+        return (
+            query.order_by(
+                BillParticipant.bill_created_at.desc(), BillParticipant.bill_id.desc()
+            )
+            .limit(limit + 1)
+            .subquery()
+        )
+
+    async def get_my_bills(self, user: dict, cursor: str | None, limit: int) -> dict:
+        # Each branch walks its own index in (created_at, id) order and stops after
+        # one page, so later pages cost the same as the first one.
+        own_query = Select(Bill.id, Bill.created_at).where(
+            Bill.created_by == user["user_id"]
+        )
+        if cursor:
+            keyset = tuple_(*self._decode_cursor(cursor))
+            own_query = own_query.where(tuple_(Bill.created_at, Bill.id) < keyset)
+
+        order_by = (Bill.created_at.desc(), Bill.id.desc())
+        own_page = own_query.order_by(*order_by).limit(limit + 1).subquery()
+        shared_page = self._get_participations_page(user, cursor, limit)
+        page_query = union(Select(own_page), Select(shared_page)).subquery()
+
+        query = (
+            Select(Bill)
+            .where(
+                tuple_(Bill.id, Bill.created_at).in_(
+                    Select(page_query.c.id, page_query.c.created_at)
+                )
+            )
+            .order_by(*order_by)
+            .limit(limit + 1)
+        )
+        return await self._get_bill_page(query, limit)
+
+    async def get_shared_with_me(
+        self, user: dict, cursor: str | None, limit: int
+    ) -> dict:
+        # The user's own bills are skipped inside the index walk: a scalar
+        # subquery stays a primary key probe per participation, where an
+        # (anti) join would be planned over all of them.
+        bill_created_by = (
+            Select(Bill.created_by)
+            .where(
+                Bill.id == BillParticipant.bill_id,
+                Bill.created_at == BillParticipant.bill_created_at,
+            )
+            .scalar_subquery()
+        )
+        page_query = self._get_participations_page(
+            user, cursor, limit, bill_created_by.is_distinct_from(user["user_id"])
+        )
+        query = (
+            Select(Bill)
+            .where(
+                tuple_(Bill.id, Bill.created_at).in_(
+                    Select(page_query.c.id, page_query.c.created_at)
+                )
+            )
+            .order_by(Bill.created_at.desc(), Bill.id.desc())
+        )
+        return await self._get_bill_page(query, limit)
+
+    async def _get_bill_page(self, query, limit: int) -> dict:
+        result = await self.db_session.execute(query)
+        bills = result.scalars().all()
+
+        next_cursor = None
+        if len(bills) > limit:
+            bills = bills[:limit]
+            next_cursor = self._encode_cursor(bills[-1])
+
+        return {
+            "items": [
+                BillSummarySchema.model_validate(bill).model_dump() for bill in bills
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    async def _get_bill_children(self, model, bills: list[Bill]) -> dict:
+        created_ats = [bill.created_at for bill in bills]
+        query = (
+            Select(model)
+            .where(
+                model.bill_id.in_([bill.id for bill in bills]),
+                model.bill_created_at.between(min(created_ats), max(created_ats)),
+            )
+            .order_by(model.id)
+        )
+        result = await self.db_session.execute(query)
+        children = defaultdict(list)
+        for child in result.scalars():
+            children[child.bill_id].append(child)
+        return children
+
+    @staticmethod
+    def _make_export_csv_rows(bill: BillExportSchema) -> list[list]:
+        bill_columns = [
+            bill.bill_number,
+            bill.type.name,
+            bill.status.name,
+            bill.currency,
+            bill.total,
+            bill.created_at.isoformat(),
+        ]
+        rows = [
+            bill_columns
+            + ["item", item.name, item.description, item.quantity, item.unit_price]
+            + [item.total, None, None]
+            for item in bill.bill_items
+        ]
+        rows += [
+            bill_columns
+            + ["participant", participant.name, participant.description, None, None]
+            + [participant.amount, participant.email, participant.payment_flag]
+            for participant in bill.bill_participants
+        ]
+        return rows or [bill_columns + ["bill"] + [None] * 7]
+
+    async def export_bills(self, user: dict, export_format: BillExportFormat):
+        """
+        Yield the user's bills with their items and participants as encoded
+        chunks, reading them through a server-side cursor one batch at a time.
+        """
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        if export_format == BillExportFormat.CSV:
+            csv_writer.writerow(EXPORT_CSV_COLUMNS)
+            yield buffer.getvalue()
+
+        query = (
+            Select(Bill)
+            .where(Bill.created_by == user["user_id"])
+            .order_by(Bill.created_at, Bill.id)
+            .execution_options(yield_per=config.BILL_EXPORT_BATCH_SIZE)
+        )
+        result = await self.db_session.stream(query)
+        async for bills in result.scalars().partitions():
+            bill_items = await self._get_bill_children(BillItem, bills)
+            bill_participants = await self._get_bill_children(BillParticipant, bills)
+
+            buffer.seek(0)
+            buffer.truncate()
+            for bill in bills:
+                set_committed_value(bill, "bill_items", bill_items[bill.id])
+                set_committed_value(
+                    bill, "bill_participants", bill_participants[bill.id]
+                )
+                export_schema = BillExportSchema.model_validate(bill)
+                if export_format == BillExportFormat.CSV:
+                    csv_writer.writerows(self._make_export_csv_rows(export_schema))
+                else:
+                    buffer.write(
+                        export_schema.model_dump_json(exclude=PER_REQUEST_FIELDS)
+                    )
+                    buffer.write("\n")
+
+            # The identity map only holds weak references, a finished batch is
+            # released once the next one is fetched.
+            yield buffer.getvalue()
+
+    async def settle(self, user: dict | None, bill_numbers: list[str]) -> dict:
+        if len(bill_numbers) > config.BILL_SETTLE_MAX_SIZE:
+            raise BillFasterBadRequestException(
+                message=f"A settlement can include at most "
+                f"{config.BILL_SETTLE_MAX_SIZE} bills"
+            )
+
+        readable_clause = Bill.share_type == BillShareType.PUBLIC
+        if user:
+            readable_clause = or_(
+                readable_clause,
+                Bill.created_by == user["user_id"],
+                self._participant_email_clause(Bill, user["email"]),
+            )
+
+        # The bill creator paid the bill, every unpaid participant owes them.
+        # Debts are summed per (currency, payer, participant) in the database.
+        payer_email = func.lower(func.trim(User.email))
+        participant_email = BillParticipant.email_normalized
+        query = (
+            Select(
+                Bill.currency,
+                payer_email,
+                participant_email,
+                func.sum(BillParticipant.amount),
+            )
+            .join(User, User.user_id == Bill.created_by)
+            .join(BillParticipant, self._bill_children_clause(BillParticipant, Bill))
+            .where(
+                self._bill_numbers_clause(bill_numbers),
+                readable_clause,
+                BillParticipant.payment_flag == False,
+                BillParticipant.email_normalized != None,
+            )
+            .group_by(Bill.currency, payer_email, participant_email)
+        )
+        result = await self.db_session.execute(query)
+
+        balances = defaultdict(lambda: defaultdict(int))
+        for currency, payer, participant, amount in result:
+            if payer == participant:
+                continue
+            units = to_minor_units(amount, get_currency_decimals(currency))
+            balances[currency][payer] += units
+            balances[currency][participant] -= units
+
+        response = {"balances": [], "transfers": []}
+        for currency, currency_balances in balances.items():
+            decimals = get_currency_decimals(currency)
+            response["balances"] += [
+                {
+                    "currency": currency,
+                    "email": email,
+                    "amount": from_minor_units(amount, decimals),
+                }
+                for email, amount in currency_balances.items()
+                if amount
+            ]
+            response["transfers"] += [
+                {
+                    "currency": currency,
+                    "from_email": debtor,
+                    "to_email": creditor,
+                    "amount": from_minor_units(amount, decimals),
+                }
+                for debtor, creditor, amount in settle_balances(currency_balances)
+            ]
+        return response
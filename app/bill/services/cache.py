@@ -0,0 +1,113 @@
+import time
+
+from redis import Redis, RedisError
+from starlette.concurrency import run_in_threadpool
+
+import config
+from app.bill.models import Bill
+from app.bill.schemas.bill import BillDetailSchema
+from core.common.cache import LRUCache
+from core.common.loggers import logger
+from core.common.redis import make_redis_client
+
+# Presigned URLs expire and are generated per request, they are never cached.
+PER_REQUEST_FIELDS = {
+    "bill_file_url",
+    "bill_file_thumbnail_url",
+    "bill_file_medium_url",
+    "payment_file_url",
+}
+
+
+class BillDetailCache:
+    """
+    Read-through cache of rendered bill details keyed by bill number and the
+    bill's updated_at stamp, with an in-process LRU tier in front of Redis.
+
+    Redis is only an accelerator on the read path: its client has short
+    timeouts, and after an error the tier is skipped for `retry_after`
+    seconds, so a stalled Redis costs reads at most one short timeout.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: int,
+        redis_client: Redis | None = None,
+        retry_after: float = 0,
+    ):
+        self.local_cache = LRUCache(max_size)
+        self.ttl = ttl
+        self.redis_client = redis_client
+        self.retry_after = retry_after
+        self._redis_retry_at = 0.0
+
+    def _use_redis(self) -> bool:
+        return bool(self.redis_client) and time.monotonic() >= self._redis_retry_at
+
+    def _on_redis_error(self, action: str, ex: RedisError):
+        logger.warning(f"Error while {action} bill cache in redis: {ex}")
+        self._redis_retry_at = time.monotonic() + self.retry_after
+
+    @staticmethod
+    def make_key(bill: Bill) -> str:
+        version = bill.updated_at.isoformat() if bill.updated_at else ""
+        return f"bill-detail:{bill.bill_number}:{version}"
+
+    async def get(self, bill: Bill) -> dict | None:
+        key = self.make_key(bill)
+        detail = self.local_cache.get(key)
+        if detail is not None or not self._use_redis():
+            return detail
+
+        try:
+            raw = await run_in_threadpool(self.redis_client.get, key)
+        except RedisError as ex:
+            # Includes timeouts, the caller falls back to the database.
+            self._on_redis_error("reading", ex)
+            return None
+        if not raw:
+            return None
+
+        detail = BillDetailSchema.model_validate_json(raw).model_dump(
+            exclude=PER_REQUEST_FIELDS
+        )
+        self.local_cache.set(key, detail)
+        return detail
+
+    async def set(self, bill: Bill, detail: BillDetailSchema):
+        key = self.make_key(bill)
+        self.local_cache.set(key, detail.model_dump(exclude=PER_REQUEST_FIELDS))
+        if not self._use_redis():
+            return
+
+        try:
+            await run_in_threadpool(
+                self.redis_client.set,
+                key,
+                detail.model_dump_json(exclude=PER_REQUEST_FIELDS),
+                ex=self.ttl,
+            )
+        except RedisError as ex:
+            self._on_redis_error("writing", ex)
+
+    async def invalidate(self, bill: Bill):
+        key = self.make_key(bill)
+        self.local_cache.delete(key)
+        if not self._use_redis():
+            return
+
+        try:
+            await run_in_threadpool(self.redis_client.delete, key)
+        except RedisError as ex:
+            self._on_redis_error("deleting", ex)
+
+
+bill_detail_cache = BillDetailCache(
+    max_size=config.BILL_CACHE_MAX_SIZE,
+    ttl=config.BILL_CACHE_TTL,
+    redis_client=make_redis_client(
+        config.BILL_CACHE_REDIS_TIMEOUT, config.BILL_CACHE_REDIS_CONNECT_TIMEOUT
+    ),
+    retry_after=config.BILL_CACHE_REDIS_RETRY_AFTER,
+)
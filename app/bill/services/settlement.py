@@ -0,0 +1,68 @@
+import heapq
+
+# Above this many non-zero balances the exact solver (n * 2^n) is too slow.
+EXACT_SETTLEMENT_MAX_SIZE = 12
+
+
+def settle_greedy(balances: dict[str, int]) -> list[tuple[str, str, int]]:
+    """
+    Repeatedly match the largest debtor with the largest creditor; at most
+    n - 1 transfers for n non-zero balances.
+    """
+    creditors = [(-amount, key) for key, amount in balances.items() if amount > 0]
+    debtors = [(amount, key) for key, amount in balances.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+
+def settle_exact(balances: dict[str, int]) -> list[tuple[str, str, int]]:
+    """
+    Minimal number of transfers: split the balances into as many zero-sum
+    groups as possible (each group of k people needs k - 1 transfers), found
+    by a DP over subsets.
+    """
+    keys = sorted(key for key, amount in balances.items() if amount)
+    size = 1 << len(keys)
+    sums = [0] * size
+    groups = [0] * size
+    for mask in range(1, size):
+        low_bit = mask & -mask
+        sums[mask] = sums[mask ^ low_bit] + balances[keys[low_bit.bit_length() - 1]]
+        best = 0
+        for index in range(len(keys)):
+            bit = 1 << index
+            if mask & bit and groups[mask ^ bit] > best:
+                best = groups[mask ^ bit]
+        groups[mask] = best + (sums[mask] == 0)
+
+    # Walk back along an optimal chain, every zero-sum mask closes a group.
+    transfers, group, mask = [], {}, size - 1
+    while mask:
+        for index in range(len(keys)):
+            bit = 1 << index
+            if mask & bit and groups[mask ^ bit] + (sums[mask] == 0) == groups[mask]:
+                break
+        group[keys[index]] = balances[keys[index]]
+        mask ^= bit
+        if sums[mask] == 0:
+            transfers += settle_greedy(group)
+            group = {}
+    return transfers
+
+
+def settle_balances(balances: dict[str, int]) -> list[tuple[str, str, int]]:
+    if sum(1 for amount in balances.values() if amount) <= EXACT_SETTLEMENT_MAX_SIZE:
+        return settle_exact(balances)
+    return settle_greedy(balances)
@@ -0,0 +1,240 @@
+import itertools
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from app.bill.schemas.bill import BillComputeSchema, BillCrUpSchema
+from app.common.constants import BillType
+from core.common.exceptions import BillFasterBadRequestException
+
+# Currencies without minor units, everything else is split in cents.
+ZERO_DECIMAL_CURRENCIES = {"VND", "JPY"}
+WEIGHT_SCALE = 10**6
+
+
+def get_currency_decimals(currency: str) -> int:
+    return 0 if currency.upper() in ZERO_DECIMAL_CURRENCIES else 2
+
+
+def to_minor_units(value: Decimal | None, decimals: int) -> int:
+    if value is None:
+        return 0
+    return int((value * 10**decimals).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(value: int, decimals: int) -> Decimal:
+    return Decimal(value).scaleb(-decimals)
+
+
+def percent_of(units: int, percent: Decimal | None) -> int:
+    if not percent:
+        return 0
+    amount = Decimal(units) * percent / 100
+    return int(amount.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def allocate_largest_remainder(totals: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Split each `totals[i]` minor units over row `weights[i]` proportionally,
+    so that every row of shares sums to its total; leftover units go to the
+    largest remainders, ties to the lowest index. Every row needs a positive
+    weight sum.
+    """
+    columns = weights.shape[1]
+    # Bounds the products and the ranking keys below.
+    bound = max(int(totals.max(initial=0)), columns + 1) * columns
+    if bound * int(weights.max(initial=0)) >= 2**63:
+        # Integer weights usually share a large factor from WEIGHT_SCALE.
+        weights = weights // np.gcd.reduce(weights, axis=1, keepdims=True)
+    if bound * int(weights.max(initial=0)) >= 2**63:
+        # Python integers past int64, a lot slower but exact.
+        totals, weights = totals.astype(object), weights.astype(object)
+    weight_sums = weights.sum(axis=1, keepdims=True)
+
+    products = totals[:, None] * weights
+    shares = products // weight_sums
+    remainders = products - shares * weight_sums
+    leftovers = totals - shares.sum(axis=1)
+    # Unique keys, larger remainder first and lower index on ties: a row's
+    # leftover units go to its `leftover` largest keys. A sort is much faster
+    # than a stable argsort.
+    keys = remainders * columns + np.arange(columns - 1, -1, -1)
+    thresholds = np.take_along_axis(
+        np.sort(keys, axis=1),
+        np.minimum(columns - leftovers, columns - 1)[:, None].astype(np.int64),
+        axis=1,
+    )
+    return shares + ((keys >= thresholds) & (leftovers > 0)[:, None])
+
+
+def _get_extra_units(
+    flag: bool,
+    amount: Decimal | None,
+    percent: Decimal | None,
+    base: int,
+    decimals: int,
+) -> int:
+    if not flag:
+        return 0
+    if amount is not None:
+        return to_minor_units(amount, decimals)
+    return percent_of(base, percent)
+
+
+def _get_item_units(item, decimals: int) -> int:
+    if item.total is not None:
+        return to_minor_units(item.total, decimals)
+    if item.unit_price is not None:
+        return to_minor_units(item.unit_price * item.quantity, decimals)
+    return 0
+
+
+def compute_split(compute_schema: BillComputeSchema) -> dict:
+    """
+    Restaurant bills are an item x participant weight matrix: each item total
+    is allocated over its row, tax, service charge and tip follow each
+    participant's item share. Simple bills split the total equally. Service
+    charge is taken on subtotal. Tip is taken on subtotal + tax for simple
+    bills and on subtotal for restaurant bills, as the web clients do.
+    """
+    decimals = get_currency_decimals(compute_schema.currency)
+    number_people = compute_schema.number_people
+
+    if compute_schema.type == BillType.RESTAURANT:
+        bill_items = compute_schema.bill_items
+        if any(
+            item.weights and len(item.weights) != number_people for item in bill_items
+        ):
+            raise BillFasterBadRequestException(
+                message="Item weights must have one entry per participant"
+            )
+
+        equal_weights = [1.0] * number_people
+        weights = np.fromiter(
+            itertools.chain.from_iterable(
+                item.weights or equal_weights for item in bill_items
+            ),
+            dtype=np.float64,
+            count=len(bill_items) * number_people,
+        ).reshape(len(bill_items), number_people)
+        totals = np.array(
+            [to_minor_units(item.total, decimals) for item in bill_items],
+            dtype=np.int64,
+        )
+        shares = allocate_largest_remainder(
+            totals, np.rint(weights * WEIGHT_SCALE).astype(np.int64)
+        )
+        item_units = shares.sum(axis=0)
+        subtotal = int(item_units.sum())
+    else:
+        subtotal = to_minor_units(compute_schema.subtotal, decimals)
+        item_units = allocate_largest_remainder(
+            np.array([subtotal]), np.ones((1, number_people), dtype=np.int64)
+        )[0]
+
+    tax = _get_extra_units(
+        compute_schema.tax_flag,
+        compute_schema.tax_amount,
+        compute_schema.tax_percent,
+        subtotal,
+        decimals,
+    )
+    service = _get_extra_units(
+        compute_schema.service_flag,
+        compute_schema.service_amount,
+        compute_schema.service_percent,
+        subtotal,
+        decimals,
+    )
+    is_restaurant = compute_schema.type == BillType.RESTAURANT
+    tip_base = subtotal if is_restaurant else subtotal + tax
+    tip = _get_extra_units(
+        compute_schema.tip_flag,
+        compute_schema.tip_amount,
+        compute_schema.tip_percent,
+        tip_base,
+        decimals,
+    )
+    # Nobody ordered anything: share the extras equally instead of dropping them.
+    extra_weights = item_units if subtotal else np.ones(number_people, dtype=np.int64)
+    tax_units, service_units, tip_units = allocate_largest_remainder(
+        np.array([tax, service, tip]), np.tile(extra_weights, (3, 1))
+    ).tolist()
+    item_units = item_units.tolist()
+
+    return {
+        "subtotal": from_minor_units(subtotal, decimals),
+        "tax_amount": from_minor_units(tax, decimals),
+        "service_amount": from_minor_units(service, decimals),
+        "tip_amount": from_minor_units(tip, decimals),
+        "total": from_minor_units(subtotal + tax + service + tip, decimals),
+        "bill_participants": [
+            {
+                "items_amount": from_minor_units(items, decimals),
+                "tax_amount": from_minor_units(tax_share, decimals),
+                "service_amount": from_minor_units(service_share, decimals),
+                "tip_amount": from_minor_units(tip_share, decimals),
+                "amount": from_minor_units(
+                    items + tax_share + service_share + tip_share, decimals
+                ),
+            }
+            for items, tax_share, service_share, tip_share in zip(
+                item_units, tax_units, service_units, tip_units
+            )
+        ],
+    }
+
+
+def validate_bill_totals(bill_schema: BillCrUpSchema):
+    """
+    Check the client-computed amounts of a bill. Every amount is rounded on its
+    own by the clients, so each rounded term may be off by one minor unit.
+    """
+    decimals = get_currency_decimals(bill_schema.currency)
+    subtotal = to_minor_units(bill_schema.subtotal, decimals)
+    if bill_schema.type == BillType.RESTAURANT and bill_schema.bill_items:
+        items_total = sum(
+            _get_item_units(item, decimals) for item in bill_schema.bill_items
+        )
+        if abs(items_total - subtotal) > len(bill_schema.bill_items):
+            raise BillFasterBadRequestException(
+                message="Bill subtotal does not match the bill items"
+            )
+
+    tax = _get_extra_units(
+        bill_schema.tax_flag,
+        bill_schema.tax_amount,
+        bill_schema.tax_percent,
+        subtotal,
+        decimals,
+    )
+    service = _get_extra_units(
+        bill_schema.service_flag,
+        bill_schema.service_amount,
+        bill_schema.service_percent,
+        subtotal,
+        decimals,
+    )
+    is_restaurant = bill_schema.type == BillType.RESTAURANT
+    tip_base = subtotal if is_restaurant else subtotal + tax
+    tip = _get_extra_units(
+        bill_schema.tip_flag,
+        bill_schema.tip_amount,
+        bill_schema.tip_percent,
+        tip_base,
+        decimals,
+    )
+    total = to_minor_units(bill_schema.total, decimals)
+    if abs(subtotal + tax + service + tip - total) > 3:
+        raise BillFasterBadRequestException(
+            message="Bill total does not match subtotal, tax, service and tip"
+        )
+
+    participants_total = sum(
+        to_minor_units(participant.amount, decimals)
+        for participant in bill_schema.bill_participants
+    )
+    if participants_total - total > len(bill_schema.bill_participants):
+        raise BillFasterBadRequestException(
+            message="Participant amounts exceed the bill total"
+        )
@@ -19,3 +19,19 @@ class BillStatus(int, Enum):
     DRAFT = 1
     FINALIZED = 2
     CANCELLED = 3
+
+
+class BillExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class FileStatus(int, Enum):
+    PENDING = 1
+    UPLOADED = 2
+
+
+class FileVariant(str, Enum):
+    ORIGINAL = "original"
+    THUMBNAIL = "thumbnail"
+    MEDIUM = "medium"
@@ -1,12 +1,25 @@
+import time
+
 from authlib.integrations.starlette_client import OAuth
 
+import config
 from config import starlette_config, JWT_ACCESS_SECRET_KEY
+from core.services.openid import OpenIDProvider
 
 social_oauth = OAuth(starlette_config)
-GOOGLE_AUTH_CONF_URL = "https://accounts.google.com/.well-known/openid-configuration"
 social_oauth.register(
     name="google",
-    server_metadata_url=GOOGLE_AUTH_CONF_URL,
+    server_metadata_url=config.GOOGLE_OPENID_CONFIGURATION_URL,
     client_kwargs={"scope": "openid email profile"},
     authorize_state=JWT_ACCESS_SECRET_KEY,
 )
+
+
+def _update_google_metadata(metadata: dict):
+    # Marked as loaded, authlib then never fetches the metadata inline itself.
+    social_oauth.google.server_metadata.update({**metadata, "_loaded_at": time.time()})
+
+
+google_openid = OpenIDProvider(
+    config.GOOGLE_OPENID_CONFIGURATION_URL, on_refresh=_update_google_metadata
+)
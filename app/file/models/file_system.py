@@ -1,12 +1,42 @@
-from sqlalchemy import String, Column, Text, DateTime, ForeignKey
+from sqlalchemy import (
+    String,
+    Column,
+    Text,
+    DateTime,
+    ForeignKey,
+    SmallInteger,
+    Boolean,
+    Index,
+    false,
+    text,
+)
 
+from app.common.constants import FileStatus
 from core.common.constants import Role
 from core.models import BillFasterBaseModel
 
 
 class FileSystem(BillFasterBaseModel):
     __tablename__ = "t_file_systems"
+    __table_args__ = (
+        Index(
+            "ix_t_file_systems_variants_pending",
+            "id",
+            postgresql_where=text("variants_pending"),
+        ),
+    )
 
     file_name = Column(String(length=255), nullable=False)
     file_path = Column(Text(), nullable=False)
     file_type = Column(String(length=50), nullable=False)
+    # Direct uploads stay PENDING until the object is verified in the bucket.
+    status = Column(SmallInteger, nullable=False, default=FileStatus.UPLOADED)
+    # SHA-256 of the content, the object key of API uploads is derived from it.
+    file_hash = Column(String(length=64), nullable=True, index=True)
+    # Resized WebP copies of images, NULL for other files.
+    thumbnail_path = Column(Text(), nullable=True)
+    medium_path = Column(Text(), nullable=True)
+    # Direct uploads get their variants from batch/jobs/file_variant.py.
+    variants_pending = Column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
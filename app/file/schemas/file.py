@@ -0,0 +1,6 @@
+from pydantic import Field, BaseModel
+
+
+class FileUploadIntentSchema(BaseModel):
+    file_name: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field(..., max_length=50)
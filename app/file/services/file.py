@@ -1,27 +1,121 @@
+import asyncio
+import hashlib
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
 from io import BytesIO
+from typing import BinaryIO
+from urllib.parse import urlparse
 
 from fastapi import UploadFile
+from sqlalchemy import Integer, Select, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from starlette.concurrency import run_in_threadpool
 
 import config
+from app.common.constants import FileStatus, FileVariant
 from app.file.models import FileSystem
+from app.file.schemas.file import FileUploadIntentSchema
+from core.common.exceptions import (
+    BillFasterBadRequestException,
+    BillFasterNotFoundException,
+)
+from core.common.loggers import logger
 from core.services.aws import S3Service
 from core.services.base import BillFasterBaseService
+from core.utils.identifier import encode_base62, generate_ulid
+from core.utils.image import make_image_variants
+
+FILE_HASH_CHUNK_SIZE = 1024 * 1024
+FILE_IMAGE_VARIANT_SIZES = {
+    FileVariant.THUMBNAIL: config.FILE_IMAGE_THUMBNAIL_SIZE,
+    FileVariant.MEDIUM: config.FILE_IMAGE_MEDIUM_SIZE,
+}
+
+# Pillow releases the GIL while decoding, resizing and encoding, threads keep
+# the uploaded file in this process instead of pickling it to another one.
+# scripts/bench_image_variants.py compares them with a process pool.
+_image_executor = ThreadPoolExecutor(
+    max_workers=config.FILE_IMAGE_WORKERS, thread_name_prefix="image-variant"
+)
+
+
+def _hash_file(file: BinaryIO, max_size: int) -> str | None:
+    """
+    SHA-256 of the file, read chunk by chunk; None as soon as it grows past
+    max_size, without reading the rest.
+    """
+    file_hash, size = hashlib.sha256(), 0
+    file.seek(0)
+    while chunk := file.read(FILE_HASH_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            return None
+        file_hash.update(chunk)
+    file.seek(0)
+    return file_hash.hexdigest()
+
+
+class _KeepOpenFile:
+    """
+    The storage client closes the file once it is uploaded, the image variants
+    read the same spooled upload afterwards.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def close(self):
+        pass
 
 
 class FileService(BillFasterBaseService):
     async def upload_file(self, upload_file: UploadFile):
-        s3_service = S3Service()
-        file_url = s3_service.bucket_upload_object(
-            bucket_name=config.AWS_S3_BUCKET_NAME,
-            file_key=f"bill-uploads/{upload_file.filename}",
-            file_content=upload_file.file,
-            ContentType=upload_file.content_type,
+        # Starlette spools the body before the handler runs: the hash and the
+        # size cap are checked on the local spool, before any byte goes to S3.
+        file_hash = None
+        if (upload_file.size or 0) <= config.FILE_UPLOAD_MAX_SIZE:
+            file_hash = await run_in_threadpool(
+                _hash_file, upload_file.file, config.FILE_UPLOAD_MAX_SIZE
+            )
+        if not file_hash:
+            raise BillFasterBadRequestException(
+                status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                message=f"File is larger than {config.FILE_UPLOAD_MAX_SIZE} bytes",
+            )
+
+        # Same bytes, same key: a file that is already stored is not sent again.
+        query = (
+            Select(FileSystem)
+            .where(
+                FileSystem.file_hash == file_hash,
+                FileSystem.status == FileStatus.UPLOADED,
+            )
+            .limit(1)
         )
+        stored_file = await self.db_session.scalar(query)
         file_system = FileSystem(
             file_name=upload_file.filename,
-            file_path=file_url,
             file_type=upload_file.content_type,
+            file_hash=file_hash,
         )
+        if stored_file:
+            file_system.file_path = stored_file.file_path
+            file_system.thumbnail_path = stored_file.thumbnail_path
+            file_system.medium_path = stored_file.medium_path
+        else:
+            s3_service = S3Service()
+            file_system.file_path = await s3_service.bucket_upload_object_async(
+                bucket_name=config.AWS_S3_BUCKET_NAME,
+                file_key=f"bill-uploads/sha256/{file_hash}",
+                file_content=_KeepOpenFile(upload_file.file),
+                ContentType=upload_file.content_type,
+            )
+            upload_file.file.seek(0)
+            await self.store_image_variants(file_system, upload_file.file)
         self.db_session.add(file_system)
         await self.db_session.commit()
         await self.db_session.refresh(file_system)
@@ -32,16 +126,155 @@ class FileService(BillFasterBaseService):
             "file_type": file_system.file_type,
         }
 
-    async def get_url(self, file_id: int):
+    async def create_upload_intent(self, upload_intent: FileUploadIntentSchema):
+        if upload_intent.content_type not in config.FILE_UPLOAD_CONTENT_TYPES:
+            raise BillFasterBadRequestException(
+                message=f"Content type {upload_intent.content_type} is not allowed"
+            )
+
+        # A fresh prefix per intent, so two uploads of "receipt.jpg" never
+        # overwrite each other in the bucket.
+        file_name = posixpath.basename(upload_intent.file_name.replace("\\", "/"))
+        file_key = f"bill-uploads/{encode_base62(generate_ulid().int)}/{file_name}"
+        s3_service = S3Service()
+        presigned_post = s3_service.bucket_generate_presigned_post(
+            bucket_name=config.AWS_S3_BUCKET_NAME,
+            file_key=file_key,
+            content_type=upload_intent.content_type,
+            max_size=config.FILE_UPLOAD_MAX_SIZE,
+            expires_in=config.FILE_UPLOAD_INTENT_EXPIRES,
+        )
+        file_system = FileSystem(
+            file_name=file_name,
+            file_path="%s/%s/%s"
+            % (
+                s3_service.client.meta.endpoint_url,
+                config.AWS_S3_BUCKET_NAME,
+                file_key,
+            ),
+            file_type=upload_intent.content_type,
+            status=FileStatus.PENDING,
+        )
+        self.db_session.add(file_system)
+        await self.db_session.commit()
+        await self.db_session.refresh(file_system)
+        return {
+            "id": file_system.id,
+            "url": presigned_post["url"],
+            "fields": presigned_post["fields"],
+            "expires_in": config.FILE_UPLOAD_INTENT_EXPIRES,
+        }
+
+    async def complete_upload(self, file_id: int):
         file_system = await self.db_session.get(FileSystem, file_id)
         if not file_system:
+            raise BillFasterNotFoundException(message="File not found")
+
+        if file_system.status != FileStatus.UPLOADED:
+            # The policy is enforced by the storage, the HEAD only proves that
+            # the browser actually finished the upload.
+            s3_service = S3Service()
+            head = await run_in_threadpool(
+                s3_service.bucket_head_object, file_system.file_path
+            )
+            if not head:
+                raise BillFasterBadRequestException(message="File is not uploaded yet")
+            if (
+                not 0 < head["ContentLength"] <= config.FILE_UPLOAD_MAX_SIZE
+                or head.get("ContentType") != file_system.file_type
+            ):
+                raise BillFasterBadRequestException(
+                    message="Uploaded file does not match the upload intent"
+                )
+
+            # Reading the object back is left to batch/jobs/file_variant.py,
+            # until then the original is served for every variant.
+            file_system.variants_pending = file_system.file_type.startswith("image/")
+            file_system.status = FileStatus.UPLOADED
+            await self.db_session.commit()
+            await self.db_session.refresh(file_system)
+
+        return {
+            "id": file_system.id,
+            "file_name": file_system.file_name,
+            "file_path": file_system.file_path,
+            "file_type": file_system.file_type,
+        }
+
+    async def store_image_variants(self, file_system: FileSystem, file: BinaryIO):
+        if not file_system.file_type.startswith("image/"):
+            return
+
+        try:
+            variants = await asyncio.get_running_loop().run_in_executor(
+                _image_executor,
+                make_image_variants,
+                file,
+                FILE_IMAGE_VARIANT_SIZES,
+                config.FILE_IMAGE_QUALITY,
+            )
+        except Exception as ex:
+            # Formats Pillow cannot decode (e.g. HEIC) are served as uploaded.
+            logger.warning(f"Error while making image variants: {ex!r}")
+            return
+
+        file_key = urlparse(file_system.file_path).path.lstrip("/").split("/", 1)[1]
+        s3_service = S3Service()
+        variant_urls = await asyncio.gather(
+            *(
+                s3_service.bucket_upload_object_async(
+                    bucket_name=config.AWS_S3_BUCKET_NAME,
+                    file_key=f"{posixpath.splitext(file_key)[0]}-{variant.value}.webp",
+                    file_content=BytesIO(variant_content),
+                    ContentType="image/webp",
+                )
+                for variant, variant_content in variants.items()
+            )
+        )
+        for variant, variant_url in zip(variants, variant_urls):
+            setattr(file_system, f"{variant.value}_path", variant_url)
+
+    async def get_url(self, file_id: int, variant: FileVariant = FileVariant.ORIGINAL):
+        file_system = await self.db_session.get(FileSystem, file_id)
+        return self.make_url(file_system, variant)
+
+    async def get_urls(
+        self, file_ids: list[int], variant: FileVariant = FileVariant.ORIGINAL
+    ) -> list[dict]:
+        query = Select(FileSystem).where(
+            FileSystem.id == any_(literal(file_ids, ARRAY(Integer))),
+            FileSystem.status == FileStatus.UPLOADED,
+        )
+        result = await self.db_session.execute(query)
+        file_systems = {file_system.id: file_system for file_system in result.scalars()}
+        # Requested order, unknown ids are left out.
+        return [
+            {"id": file_id, **self.make_url(file_systems[file_id], variant)}
+            for file_id in dict.fromkeys(file_ids)
+            if file_id in file_systems
+        ]
+
+    def make_url(
+        self,
+        file_system: FileSystem | None,
+        variant: FileVariant = FileVariant.ORIGINAL,
+    ):
+        if not file_system or file_system.status != FileStatus.UPLOADED:
             return None
 
+        # Files without derivatives (not an image, uploaded earlier) fall back
+        # to the original.
+        file_path, file_type = file_system.file_path, file_system.file_type
+        if variant != FileVariant.ORIGINAL:
+            variant_path = getattr(file_system, f"{variant.value}_path")
+            if variant_path:
+                file_path, file_type = variant_path, "image/webp"
+
         s3_service = S3Service()
-        url = s3_service.file_download_generate_presigned_url(file_system.file_path)
+        url = s3_service.file_download_generate_presigned_url(file_path)
         return {
             "file_name": file_system.file_name,
-            "file_type": file_system.file_type,
+            "file_type": file_type,
             "file_url": url,
         }
 
@@ -50,8 +283,20 @@ class FileService(BillFasterBaseService):
         if not file_system:
             return None
 
-        s3_service = S3Service()
-        s3_service.bucket_delete_file_url(file_system.file_path)
+        # Deduplicated uploads share the object, it goes with the last row.
+        query = Select(FileSystem.id).where(
+            FileSystem.file_path == file_system.file_path,
+            FileSystem.id != file_system.id,
+        )
+        if not await self.db_session.scalar(query.limit(1)):
+            s3_service = S3Service()
+            for file_path in (
+                file_system.file_path,
+                file_system.thumbnail_path,
+                file_system.medium_path,
+            ):
+                if file_path:
+                    s3_service.bucket_delete_file_url(file_path)
 
         await self.db_session.delete(file_system)
         await self.db_session.commit()
@@ -0,0 +1,27 @@
+import asyncio
+
+import config
+from batch.services.auth_token import AuthTokenPurgeService
+from core.common.database import AsyncSessionLocal, async_engine
+from core.common.loggers import logger
+
+
+async def main():
+    """
+    Delete expired refresh tokens and session revocations. Run hourly, e.g.
+    `python -m batch.jobs.auth_token` from cron.
+    """
+    async with AsyncSessionLocal() as db_session:
+        purge_service = AuthTokenPurgeService(db_session)
+        tokens = await purge_service.purge_expired_tokens(
+            config.AUTH_TOKEN_PURGE_BATCH_SIZE
+        )
+        revocations = await purge_service.purge_expired_revocations(
+            config.AUTH_TOKEN_PURGE_BATCH_SIZE
+        )
+    await async_engine.dispose()
+    logger.info(f"Purged {tokens} expired tokens, {revocations} expired revocations")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import asyncio
+import datetime
+
+import config
+from batch.services.bill_partition import BillPartitionService, add_months
+from core.common.database import AsyncSessionLocal, async_engine
+from core.common.loggers import logger
+
+
+async def main():
+    """
+    Create the bill partitions for the coming months and archive the cold
+    ones. Run daily, e.g. `python -m batch.jobs.bill_partition` from cron; the
+    months created ahead leave that many months of missed runs before new bills
+    land in the DEFAULT partitions.
+    """
+    current_month = datetime.date.today().replace(day=1)
+    async with AsyncSessionLocal() as db_session:
+        partition_service = BillPartitionService(db_session)
+        created = await partition_service.create_partitions(
+            current_month, config.BILL_PARTITION_MONTHS_AHEAD
+        )
+        archived = await partition_service.archive_partitions(
+            add_months(current_month, -config.BILL_PARTITION_RETENTION_MONTHS)
+        )
+    await async_engine.dispose()
+    logger.info(f"Created partitions {created}, archived partitions {archived}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+import asyncio
+
+import config
+from batch.services.file_variant import FileVariantService
+from core.common.database import AsyncSessionLocal, async_engine
+from core.common.loggers import logger
+
+
+async def main():
+    """
+    Make the image variants of completed direct uploads. Run every minute,
+    e.g. `python -m batch.jobs.file_variant` from cron.
+    """
+    async with AsyncSessionLocal() as db_session:
+        processed = await FileVariantService(db_session).make_pending_variants(
+            config.FILE_VARIANT_BATCH_SIZE
+        )
+    await async_engine.dispose()
+    logger.info(f"Made image variants of {processed} files")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import datetime
+
+from sqlalchemy import delete, select
+
+from app.auth.models import AuthRevokedSession, AuthToken
+from core.services.base import BillFasterBaseService
+
+
+class AuthTokenPurgeService(BillFasterBaseService):
+    """
+    Deletes expired refresh tokens and session revocations in chunks, each in
+    its own transaction, so that locks and WAL stay small.
+    """
+
+    async def _purge(self, model, expired_before, batch_size: int) -> int:
+        chunk = (
+            select(model.id)
+            .where(model.expires_at < expired_before)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        purged = 0
+        while True:
+            result = await self.db_session.execute(
+                delete(model).where(model.id.in_(chunk))
+            )
+            await self.db_session.commit()
+            purged += result.rowcount
+            if result.rowcount < batch_size:
+                return purged
+
+    async def purge_expired_tokens(self, batch_size: int) -> int:
+        # Refresh token expiries are stored in UTC, see create_token.
+        return await self._purge(AuthToken, datetime.datetime.utcnow(), batch_size)
+
+    async def purge_expired_revocations(self, batch_size: int) -> int:
+        return await self._purge(
+            AuthRevokedSession, datetime.datetime.now(), batch_size
+        )
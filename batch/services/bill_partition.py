@@ -0,0 +1,191 @@
+import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+import config
+from core.common.loggers import logger
+from core.services.base import BillFasterBaseService
+
+# Children reference their bill's partition: partitions are created parents
+# first and detached children first.
+BILL_PARTITION_KEYS = {
+    "t_bills": "created_at",
+    "t_bill_items": "bill_created_at",
+    "t_bill_participants": "bill_created_at",
+}
+BILL_PARTITIONED_TABLES = list(BILL_PARTITION_KEYS)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.date(year, month_index + 1, 1)
+
+
+def get_partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+class BillPartitionService(BillFasterBaseService):
+    """
+    Monthly range partitions of the bill tables. Rows outside of them land in
+    the DEFAULT partitions, which stay empty as long as the partitions are
+    created ahead of time.
+    """
+
+    async def _execute(self, statement: str):
+        logger.info(statement)
+        await self.db_session.execute(text(statement))
+
+    async def _get_partition_months(self, table: str) -> list[datetime.date]:
+        query = text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        )
+        result = await self.db_session.execute(query, {"table": table})
+        months = []
+        for name in result.scalars():
+            try:
+                month = datetime.datetime.strptime(name[-6:], "%Y%m").date()
+            except ValueError:
+                continue
+            if name == get_partition_name(table, month):
+                months.append(month)
+        return sorted(months)
+
+    async def _get_default_partition(self, table: str) -> str | None:
+        query = text(
+            "SELECT c.relname FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partdefid "
+            "WHERE p.partrelid = CAST(:table AS regclass)"
+        )
+        result = await self.db_session.execute(query, {"table": table})
+        return result.scalar()
+
+    async def _get_insert_columns(self, table: str) -> str:
+        # Generated columns are computed again on insert.
+        query = text(
+            "SELECT attname FROM pg_attribute "
+            "WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 "
+            "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum"
+        )
+        result = await self.db_session.execute(query, {"table": table})
+        return ", ".join(result.scalars())
+
+    async def _create_month_partitions(self, month: datetime.date) -> list[str]:
+        next_month = add_months(month, 1)
+        tables = [
+            table
+            for table in BILL_PARTITIONED_TABLES
+            if month not in await self._get_partition_months(table)
+        ]
+
+        # Rows of the month in a DEFAULT partition make CREATE TABLE fail, they
+        # are moved out and back into the new partition in the same transaction.
+        moved_tables = []
+        for table in reversed(tables):
+            default_partition = await self._get_default_partition(table)
+            if not default_partition:
+                continue
+
+            key = BILL_PARTITION_KEYS[table]
+            await self._execute(
+                f"CREATE TEMPORARY TABLE {table}_moved (LIKE {table}) "
+                f"ON COMMIT DROP"
+            )
+            await self._execute(
+                f"WITH moved AS (DELETE FROM {default_partition} "
+                f"WHERE {key} >= '{month}' AND {key} < '{next_month}' "
+                f"RETURNING *) INSERT INTO {table}_moved SELECT * FROM moved"
+            )
+            moved_tables.append(table)
+
+        created = []
+        for table in tables:
+            name = get_partition_name(table, month)
+            await self._execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            )
+            created.append(name)
+        for table in reversed(moved_tables):
+            columns = await self._get_insert_columns(table)
+            await self._execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM {table}_moved"
+            )
+        await self.db_session.commit()
+        return created
+
+    async def create_partitions(
+        self, current_month: datetime.date, months_ahead: int
+    ) -> list[str]:
+        """Create the missing partitions, each month in its own transaction."""
+        created = []
+        for offset in range(months_ahead + 1):
+            created += await self._create_month_partitions(
+                add_months(current_month, offset)
+            )
+        return created
+
+    async def _archive_month_partitions(self, month: datetime.date) -> list[str]:
+        schema = config.BILL_PARTITION_ARCHIVE_SCHEMA
+        # DETACH PARTITION takes an ACCESS EXCLUSIVE lock on the parent table,
+        # held until commit: every read and write of the table waits. The
+        # lock timeout gives up instead of queueing behind long queries, with
+        # all the traffic that would then queue behind the DETACH.
+        await self._execute(
+            f"SET LOCAL lock_timeout = {config.BILL_PARTITION_LOCK_TIMEOUT}"
+        )
+        archived = []
+        for table in reversed(BILL_PARTITIONED_TABLES):
+            name = get_partition_name(table, month)
+            if month not in await self._get_partition_months(table):
+                continue
+
+            # Not CONCURRENTLY: Postgres refuses it while the parent has a
+            # DEFAULT partition.
+            await self._execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            # The detached table keeps its foreign keys to the live tables,
+            # which would block detaching the partition they point to.
+            query = text(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"
+            )
+            result = await self.db_session.execute(query, {"name": name})
+            for constraint in result.scalars().all():
+                await self._execute(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}")
+            await self._execute(f"ALTER TABLE {name} SET SCHEMA {schema}")
+            archived.append(f"{schema}.{name}")
+        await self.db_session.commit()
+        return archived
+
+    async def archive_partitions(self, cutoff_month: datetime.date) -> list[str]:
+        """
+        Detach the partitions older than `cutoff_month` and move them to the
+        archive schema, where they can be dumped and dropped without touching
+        the live tables. Each month is detached from the three tables in one
+        short transaction; a month whose locks are not granted within
+        BILL_PARTITION_LOCK_TIMEOUT is left for the next run.
+        """
+        schema = config.BILL_PARTITION_ARCHIVE_SCHEMA
+        months = [
+            month
+            for month in await self._get_partition_months(BILL_PARTITIONED_TABLES[0])
+            if month < cutoff_month
+        ]
+        if not months:
+            return []
+
+        await self._execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        await self.db_session.commit()
+        archived = []
+        for month in months:
+            try:
+                archived += await self._archive_month_partitions(month)
+            except DBAPIError as ex:
+                await self.db_session.rollback()
+                logger.warning(f"Archiving the partitions of {month} failed: {ex}")
+                break
+        return archived
@@ -0,0 +1,55 @@
+from tempfile import SpooledTemporaryFile
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+import config
+from app.file.models import FileSystem
+from app.file.services.file import FileService
+from core.common.exceptions import BillFasterServiceException
+from core.common.loggers import logger
+from core.services.aws import S3Service
+from core.services.base import BillFasterBaseService
+
+# Larger images spill from memory to a temporary file on disk.
+FILE_VARIANT_SPOOL_SIZE = 1024 * 1024
+
+
+class FileVariantService(BillFasterBaseService):
+    """
+    Image variants of direct uploads, made out of the request path. Rows are
+    claimed with SKIP LOCKED, so overlapping runs share the work.
+    """
+
+    async def _store_variants(self, file_system: FileSystem):
+        s3_service = S3Service()
+        with SpooledTemporaryFile(max_size=FILE_VARIANT_SPOOL_SIZE) as file:
+            try:
+                await run_in_threadpool(
+                    s3_service.bucket_download_object, file_system.file_path, file
+                )
+            except BillFasterServiceException as ex:
+                # Deleted since, nothing to make variants of.
+                logger.warning(f"File {file_system.id} not downloaded: {ex.message}")
+                return
+            file.seek(0)
+            await FileService(self.db_session).store_image_variants(file_system, file)
+
+    async def make_pending_variants(self, batch_size: int) -> int:
+        processed = 0
+        while True:
+            query = (
+                select(FileSystem)
+                .where(FileSystem.variants_pending)
+                .order_by(FileSystem.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            file_systems = (await self.db_session.scalars(query)).all()
+            for file_system in file_systems:
+                await self._store_variants(file_system)
+                file_system.variants_pending = False
+            await self.db_session.commit()
+            processed += len(file_systems)
+            if len(file_systems) < batch_size:
+                return processed
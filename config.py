@@ -27,8 +27,19 @@ LOGGER_LEVEL = os.getenv("LOGGER_LEVEL")
 JWT_ACCESS_SECRET_KEY = os.getenv("JWT_ACCESS_SECRET_KEY")
 JWT_REFRESH_SECRET_KEY = os.getenv("JWT_REFRESH_SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRED = int(os.getenv("ACCESS_TOKEN_EXPIRED"))
+# Access tokens are only checked against the revocation set, which keeps each
+# entry as long as the tokens live: their lifetime (minutes) is capped.
+ACCESS_TOKEN_MAX_EXPIRED = int(os.getenv("ACCESS_TOKEN_MAX_EXPIRED", 60))
+ACCESS_TOKEN_EXPIRED = min(
+    int(os.getenv("ACCESS_TOKEN_EXPIRED")), ACCESS_TOKEN_MAX_EXPIRED
+)
 REFRESH_TOKEN_EXPIRED = int(os.getenv("REFRESH_TOKEN_EXPIRED"))
+# Passwords hashed with another cost are rehashed on the next sign-in.
+AUTH_BCRYPT_ROUNDS = int(os.getenv("AUTH_BCRYPT_ROUNDS", 12))
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", 2))
+# Hashes waiting for a worker, beyond that sign-ins get a 429.
+AUTH_HASH_QUEUE_SIZE = int(os.getenv("AUTH_HASH_QUEUE_SIZE", 16))
+AUTH_TOKEN_PURGE_BATCH_SIZE = int(os.getenv("AUTH_TOKEN_PURGE_BATCH_SIZE", 1000))
 
 # --------------------------- CORS --------------------------------
 CORS_ALLOWED_ORIGINS: list = [
@@ -53,6 +64,39 @@ ASYNC_DATABASE_CONN_URL = URL.create(
 )
 DATABASE_CONN_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
 
+# =========================== REDIS ===============================
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_USERNAME = os.getenv("REDIS_USERNAME")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+
+# --------------------------- CACHE --------------------------------
+BILL_CACHE_MAX_SIZE = int(os.getenv("BILL_CACHE_MAX_SIZE", 1024))
+BILL_CACHE_TTL = int(os.getenv("BILL_CACHE_TTL", 3600))
+# Seconds. Bill reads wait at most this long on Redis before using the database.
+BILL_CACHE_REDIS_TIMEOUT = float(os.getenv("BILL_CACHE_REDIS_TIMEOUT", 0.1))
+BILL_CACHE_REDIS_CONNECT_TIMEOUT = float(
+    os.getenv("BILL_CACHE_REDIS_CONNECT_TIMEOUT", 0.1)
+)
+BILL_CACHE_REDIS_RETRY_AFTER = int(os.getenv("BILL_CACHE_REDIS_RETRY_AFTER", 30))
+# Shared responses embed presigned URLs valid for at least
+# AWS_S3_PRESIGNED_URL_EXPIRES - AWS_S3_PRESIGNED_URL_CACHE_TTL (3600s), longer
+# values are capped to that.
+BILL_FINALIZED_CACHE_MAX_AGE = int(os.getenv("BILL_FINALIZED_CACHE_MAX_AGE", 3000))
+
+# --------------------------- BILL --------------------------------
+BILL_BATCH_CREATE_MAX_SIZE = int(os.getenv("BILL_BATCH_CREATE_MAX_SIZE", 2000))
+BILL_EXPORT_BATCH_SIZE = int(os.getenv("BILL_EXPORT_BATCH_SIZE", 500))
+BILL_SETTLE_MAX_SIZE = int(os.getenv("BILL_SETTLE_MAX_SIZE", 50000))
+BILL_PARTITION_MONTHS_AHEAD = int(os.getenv("BILL_PARTITION_MONTHS_AHEAD", 6))
+BILL_PARTITION_RETENTION_MONTHS = int(os.getenv("BILL_PARTITION_RETENTION_MONTHS", 24))
+BILL_PARTITION_ARCHIVE_SCHEMA = os.getenv("BILL_PARTITION_ARCHIVE_SCHEMA", "archive")
+# Milliseconds the archive job waits for the table locks of a DETACH.
+BILL_PARTITION_LOCK_TIMEOUT = int(os.getenv("BILL_PARTITION_LOCK_TIMEOUT", 3000))
+
+# --------------------------- PAGINATION --------------------------------
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+
 # --------------------------- FASTAPI --------------------------------
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 statics = StaticFiles(directory=os.path.join(BASE_DIR, "statics"))
@@ -74,6 +118,38 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_S3_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
 AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL")
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_S3_MAX_POOL_CONNECTIONS", 50))
+AWS_S3_MAX_ATTEMPTS = int(os.getenv("AWS_S3_MAX_ATTEMPTS", 5))
+# Uploads run on their own pool, each using up to MULTIPART_CONCURRENCY
+# connections of the shared client for parts above MULTIPART_THRESHOLD bytes.
+AWS_S3_UPLOAD_WORKERS = int(os.getenv("AWS_S3_UPLOAD_WORKERS", 8))
+AWS_S3_MULTIPART_THRESHOLD = int(
+    os.getenv("AWS_S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024)
+)
+AWS_S3_MULTIPART_CHUNKSIZE = int(
+    os.getenv("AWS_S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)
+)
+AWS_S3_MULTIPART_CONCURRENCY = int(os.getenv("AWS_S3_MULTIPART_CONCURRENCY", 4))
+# A cached presigned URL is served for at most CACHE_TTL seconds, so it stays
+# valid for at least EXPIRES - CACHE_TTL seconds after it is handed out.
+AWS_S3_PRESIGNED_URL_EXPIRES = int(os.getenv("AWS_S3_PRESIGNED_URL_EXPIRES", 7200))
+AWS_S3_PRESIGNED_URL_CACHE_TTL = int(os.getenv("AWS_S3_PRESIGNED_URL_CACHE_TTL", 3600))
+AWS_S3_PRESIGNED_URL_CACHE_SIZE = int(
+    os.getenv("AWS_S3_PRESIGNED_URL_CACHE_SIZE", 10000)
+)
+
+# --------------------------- FILE --------------------------------
+FILE_UPLOAD_MAX_SIZE = int(os.getenv("FILE_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+FILE_UPLOAD_CONTENT_TYPES = os.getenv(
+    "FILE_UPLOAD_CONTENT_TYPES", "image/jpeg,image/png,image/webp,image/heic"
+).split(",")
+FILE_UPLOAD_INTENT_EXPIRES = int(os.getenv("FILE_UPLOAD_INTENT_EXPIRES", 600))
+# Longest side in pixels of the WebP derivatives made from uploaded images.
+FILE_IMAGE_THUMBNAIL_SIZE = int(os.getenv("FILE_IMAGE_THUMBNAIL_SIZE", 320))
+FILE_IMAGE_MEDIUM_SIZE = int(os.getenv("FILE_IMAGE_MEDIUM_SIZE", 1280))
+FILE_IMAGE_QUALITY = int(os.getenv("FILE_IMAGE_QUALITY", 80))
+FILE_IMAGE_WORKERS = int(os.getenv("FILE_IMAGE_WORKERS", 2))
+FILE_VARIANT_BATCH_SIZE = int(os.getenv("FILE_VARIANT_BATCH_SIZE", 20))
 
 
 # --------------------------- SOCIAL --------------------------------
@@ -81,6 +157,10 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_AUTH_LOGIN_URL = os.getenv("GOOGLE_AUTH_LOGIN_URL")
 GOOGLE_AUTH_TOKEN_CALLBACK_URL = os.getenv("GOOGLE_AUTH_TOKEN_CALLBACK_URL")
+GOOGLE_OPENID_CONFIGURATION_URL = os.getenv(
+    "GOOGLE_OPENID_CONFIGURATION_URL",
+    "https://accounts.google.com/.well-known/openid-configuration",
+)
 starlette_config = Config(
     environ={
         "GOOGLE_CLIENT_ID": GOOGLE_CLIENT_ID,
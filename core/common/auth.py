@@ -1,3 +1,7 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Union, Any
 
@@ -11,11 +15,27 @@ from config import (
     JWT_ACCESS_SECRET_KEY,
     ALGORITHM,
     JWT_REFRESH_SECRET_KEY,
+    AUTH_BCRYPT_ROUNDS,
+    AUTH_HASH_WORKERS,
+    AUTH_HASH_QUEUE_SIZE,
 )
 from core.common.constants import TokenType
-from core.common.exceptions import BillFasterBadRequestException
+from core.common.exceptions import (
+    BillFasterBadRequestException,
+    BillFasterTooManyRequestsException,
+)
+
+crypt_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=AUTH_BCRYPT_ROUNDS
+)
 
-crypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt releases the GIL, a few threads keep hashing off the event loop. The
+# slots bound the queue in front of them: a login storm is turned away instead
+# of piling up behind the workers.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=AUTH_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_WORKERS + AUTH_HASH_QUEUE_SIZE)
 
 
 def get_hashed_password(password: str) -> str:
@@ -26,20 +46,54 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return crypt_context.verify(password, hashed_password)
 
 
+async def _run_hash(func, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise BillFasterTooManyRequestsException()
+    try:
+        future = _hash_executor.submit(func, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    # Released when the hash is done, not when the caller stops waiting: a
+    # cancelled sign-in leaves its hash running in the pool.
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def get_hashed_password_async(password: str) -> str:
+    return await _run_hash(crypt_context.hash, password)
+
+
+async def verify_and_update_password_async(
+    password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Like verify_password, plus a new hash when the stored one was made with
+    another cost than AUTH_BCRYPT_ROUNDS.
+    """
+    return await _run_hash(crypt_context.verify_and_update, password, hashed_password)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def create_token(
-    subject: Union[dict, Any], token_type: TokenType = TokenType.REFRESH_TOKEN
+    subject: Union[dict, Any],
+    token_type: TokenType = TokenType.REFRESH_TOKEN,
+    claims: dict | None = None,
 ) -> tuple[str, datetime]:
     if token_type == TokenType.REFRESH_TOKEN:
         expires_delta = datetime.utcnow() + timedelta(minutes=REFRESH_TOKEN_EXPIRED)
-        to_encode = {"exp": expires_delta, "sub": subject}
+        to_encode = {**(claims or {}), "exp": expires_delta, "sub": subject}
         token = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, ALGORITHM)
     elif token_type == TokenType.ACCESS_TOKEN:
         expires_delta = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRED)
-        to_encode = {"exp": expires_delta, "sub": subject}
+        to_encode = {**(claims or {}), "exp": expires_delta, "sub": subject}
         token = jwt.encode(to_encode, JWT_ACCESS_SECRET_KEY, ALGORITHM)
     elif token_type == TokenType.RESET_PASSWORD_TOKEN:
         expires_delta = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRED)
-        to_encode = {"exp": expires_delta, "sub": subject}
+        to_encode = {**(claims or {}), "exp": expires_delta, "sub": subject}
         token = jwt.encode(to_encode, JWT_ACCESS_SECRET_KEY, ALGORITHM)
     else:
         raise BillFasterBadRequestException(message=_("Token type not allow"))
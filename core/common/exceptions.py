@@ -39,3 +39,10 @@ class BillFasterUnAuthenticatedException(BillFasterBaseException):
         self, status_code=status.HTTP_401_UNAUTHORIZED, message=None, **kwargs
     ):
         super().__init__(status_code, message or _("UnAuthenticated"), **kwargs)
+
+
+class BillFasterTooManyRequestsException(BillFasterBaseException):
+    def __init__(
+        self, status_code=status.HTTP_429_TOO_MANY_REQUESTS, message=None, **kwargs
+    ):
+        super().__init__(status_code, message or _("Too many requests!"), **kwargs)
@@ -0,0 +1,19 @@
+import redis
+
+import config
+
+
+def make_redis_client(
+    socket_timeout: float, socket_connect_timeout: float | None = None
+) -> redis.Redis | None:
+    if not config.REDIS_HOST:
+        return None
+
+    return redis.Redis(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        username=config.REDIS_USERNAME,
+        password=config.REDIS_PASSWORD,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_connect_timeout,
+    )
@@ -1,32 +1,86 @@
+import asyncio
+import contextvars
+import functools
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from fastapi_babel import _
 
 import config
+from core.common.cache import LRUCache
 from core.common.exceptions import BillFasterServiceException
 from core.common.loggers import logger
 
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+# boto3 transfers block, they run here so the event loop keeps serving requests.
+_upload_executor = ThreadPoolExecutor(
+    max_workers=config.AWS_S3_UPLOAD_WORKERS, thread_name_prefix="s3-upload"
+)
+_transfer_config = TransferConfig(
+    multipart_threshold=config.AWS_S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=config.AWS_S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=config.AWS_S3_MULTIPART_CONCURRENCY,
+)
+
+presigned_url_cache = LRUCache(
+    config.AWS_S3_PRESIGNED_URL_CACHE_SIZE, ttl=config.AWS_S3_PRESIGNED_URL_CACHE_TTL
+)
+
+
+def _create_s3_client(**kwargs):
+    session = boto3.Session(
+        region_name=config.AWS_REGION,
+        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+        **kwargs,
+    )
+    return session.client(
+        "s3",
+        endpoint_url=config.AWS_S3_ENDPOINT_URL,
+        config=Config(
+            max_pool_connections=config.AWS_S3_MAX_POOL_CONNECTIONS,
+            retries={
+                "total_max_attempts": config.AWS_S3_MAX_ATTEMPTS,
+                "mode": "adaptive",
+            },
+        ),
+    )
+
+
+def get_s3_client():
+    """
+    Process-wide S3 client. boto3 clients are thread-safe (sessions are not),
+    so one client and its connection pool are shared by every request.
+    """
+    global _s3_client
+
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = _create_s3_client()
+    return _s3_client
+
 
 class S3Service:
     def __init__(self, **kwargs):
-        session = boto3.Session(
-            region_name=config.AWS_REGION,
-            aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
-            **kwargs,
-        )
-        self.client = session.client(
-            "s3",
-            endpoint_url=config.AWS_S3_ENDPOINT_URL,
-        )
+        self.client = _create_s3_client(**kwargs) if kwargs else get_s3_client()
 
     def bucket_upload_object(self, bucket_name, file_key, file_content, **kwargs):
         try:
             self.client.upload_fileobj(
-                file_content, Bucket=bucket_name, Key=file_key, ExtraArgs=kwargs
+                file_content,
+                Bucket=bucket_name,
+                Key=file_key,
+                ExtraArgs=kwargs,
+                Config=_transfer_config,
             )
             return "%s/%s/%s" % (self.client.meta.endpoint_url, bucket_name, file_key)
 
@@ -35,6 +89,51 @@ class S3Service:
                 message=_("Upload to storage failed! Error {ex}").format(ex=repr(ex))
             )
 
+    async def bucket_upload_object_async(
+        self, bucket_name, file_key, file_content, **kwargs
+    ):
+        upload = functools.partial(
+            self.bucket_upload_object, bucket_name, file_key, file_content, **kwargs
+        )
+        # Copy the context so that translated error messages still resolve.
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _upload_executor, context.run, upload
+        )
+
+    def bucket_generate_presigned_post(
+        self, bucket_name, file_key, content_type, max_size, expires_in
+    ):
+        """
+        Policy for a browser form upload straight to the bucket, the storage
+        rejects bodies outside [1, max_size] bytes or with another content type.
+        """
+        try:
+            response = self.client.generate_presigned_post(
+                Bucket=bucket_name,
+                Key=file_key,
+                Fields={"Content-Type": content_type},
+                Conditions=[
+                    ["content-length-range", 1, max_size],
+                    {"Content-Type": content_type},
+                ],
+                ExpiresIn=expires_in,
+            )
+            return response
+        except Exception as ex:
+            raise BillFasterServiceException(
+                message=_("Upload to storage failed! Error {ex}").format(ex=repr(ex))
+            )
+
+    def bucket_head_object(self, url):
+        try:
+            bucket_file_path = urlparse(url).path.lstrip("/")
+            bucket_name, file_key = bucket_file_path.split("/", 1)
+            return self.client.head_object(Bucket=bucket_name, Key=file_key)
+        except ClientError as ex:
+            logger.warning(f"Error while getting file from S3 bucket: {ex}")
+            return None
+
     def bucket_download_file_to_temp(self, url):
         try:
             bucket_file_path = urlparse(url).path.lstrip("/")
@@ -58,12 +157,28 @@ class S3Service:
                 )
             )
 
+    def bucket_download_object(self, url, file):
+        """Write the object at url to file, in parts for large objects."""
+        try:
+            bucket_file_path = urlparse(url).path.lstrip("/")
+            bucket_name, file_key = bucket_file_path.split("/", 1)
+            self.client.download_fileobj(
+                bucket_name, file_key, file, Config=_transfer_config
+            )
+        except Exception as ex:
+            raise BillFasterServiceException(
+                message=_(
+                    "Download from storage failed! Error {ex}".format(ex=repr(ex))
+                )
+            )
+
     def bucket_delete_file_url(self, url):
         try:
             bucket_file_path = urlparse(url).path.lstrip("/")
             bucket_name = bucket_file_path.split("/", 1)[0]
             file_key = bucket_file_path.split("/", 1)[1]
             self.client.delete_object(Bucket=bucket_name, Key=file_key)
+            presigned_url_cache.delete(url)
         except Exception as ex:
             raise BillFasterServiceException(
                 message=_(
@@ -74,6 +189,12 @@ class S3Service:
             )
 
     def file_download_generate_presigned_url(self, url):
+        # Repeat reads of the same file reuse the signature until the cache
+        # entry expires, well before the URL itself does.
+        presigned_url = presigned_url_cache.get(url)
+        if presigned_url:
+            return presigned_url
+
         try:
             bucket_file_path = urlparse(url).path.lstrip("/")
             bucket_name = bucket_file_path.split("/", 1)[0]
@@ -81,7 +202,9 @@ class S3Service:
             response = self.client.generate_presigned_url(
                 "get_object",
                 Params={"Bucket": bucket_name, "Key": file_key},
+                ExpiresIn=config.AWS_S3_PRESIGNED_URL_EXPIRES,
             )
+            presigned_url_cache.set(url, response)
             return response
         except Exception as e:
             logging.error(e)
@@ -0,0 +1,114 @@
+import asyncio
+import re
+import time
+
+import httpx
+from jose import jwt
+
+from core.common.loggers import logger
+
+# Used when a response carries no max-age.
+OPENID_DEFAULT_MAX_AGE = 3600
+# Refresh once this share of the max-age has passed, before the cache is stale.
+OPENID_REFRESH_RATIO = 0.8
+OPENID_RETRY_DELAY = 30
+# An unknown "kid" forces a key refresh, but not more often than this.
+OPENID_MIN_REFRESH_INTERVAL = 60
+OPENID_REQUEST_TIMEOUT = 10
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def get_max_age(response: httpx.Response) -> int:
+    match = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else OPENID_DEFAULT_MAX_AGE
+
+
+class OpenIDProvider:
+    """
+    Discovery document and signing keys (JWKS) of an OpenID provider. Both are
+    fetched asynchronously, kept for the max-age of their Cache-Control and
+    refreshed in the background before they expire.
+    """
+
+    def __init__(self, metadata_url: str, on_refresh=None):
+        self.metadata_url = metadata_url
+        self.metadata = None
+        self.jwks = None
+        self._on_refresh = on_refresh
+        self._max_age = OPENID_DEFAULT_MAX_AGE
+        self._expires_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._client = httpx.AsyncClient(timeout=OPENID_REQUEST_TIMEOUT)
+        self._refresh_task = None
+
+    async def _fetch(self, url: str) -> tuple[dict, int]:
+        response = await self._client.get(url)
+        response.raise_for_status()
+        return response.json(), get_max_age(response)
+
+    async def refresh(self, force: bool = False):
+        async with self._lock:
+            # Whoever waited on the lock finds the keys already refreshed.
+            if not force and time.monotonic() < self._expires_at:
+                return
+
+            metadata, metadata_max_age = await self._fetch(self.metadata_url)
+            jwks, jwks_max_age = await self._fetch(metadata["jwks_uri"])
+            self.metadata, self.jwks = metadata, jwks
+            self._max_age = min(metadata_max_age, jwks_max_age)
+            self._refreshed_at = time.monotonic()
+            self._expires_at = self._refreshed_at + self._max_age
+            if self._on_refresh:
+                self._on_refresh(metadata)
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh(force=True)
+                delay = self._max_age * OPENID_REFRESH_RATIO
+            except Exception as ex:
+                # The cached copy stays in use until it expires.
+                logger.warning(f"Error while refreshing {self.metadata_url}: {ex!r}")
+                delay = OPENID_RETRY_DELAY
+            await asyncio.sleep(delay)
+
+    async def start(self):
+        # The first round pre-warms the cache, startup does not wait on it.
+        self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        await self._client.aclose()
+
+    async def get_metadata(self) -> dict:
+        await self.refresh()
+        return self.metadata
+
+    async def verify_id_token(
+        self, id_token: str, audience: str, access_token: str | None = None
+    ) -> dict:
+        """Claims of a signed ID token, raises JWTError when it is not valid."""
+        await self.refresh()
+        kid = jwt.get_unverified_header(id_token).get("kid")
+        if (
+            kid not in {key.get("kid") for key in self.jwks["keys"]}
+            and time.monotonic() - self._refreshed_at > OPENID_MIN_REFRESH_INTERVAL
+        ):
+            # The provider rotated its keys since the last fetch.
+            await self.refresh(force=True)
+
+        issuer = self.metadata["issuer"]
+        return jwt.decode(
+            id_token,
+            self.jwks,
+            algorithms=self.metadata.get(
+                "id_token_signing_alg_values_supported", ["RS256"]
+            ),
+            audience=audience,
+            # Google also issues tokens with the scheme-less issuer.
+            issuer=[issuer, issuer.removeprefix("https://")],
+            access_token=access_token,
+        )
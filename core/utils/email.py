@@ -0,0 +1,6 @@
+def normalize_email(email: str) -> str:
+    """
+    Same normalization as the generated t_bill_participants.email_normalized
+    column.
+    """
+    return email.strip().lower()
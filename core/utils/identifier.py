@@ -0,0 +1,78 @@
+import datetime
+import secrets
+import threading
+import time
+import uuid
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE62_INDEX = {char: index for index, char in enumerate(BASE62_ALPHABET)}
+# 62 ** 22 > 2 ** 128, so every 128-bit id renders to exactly 22 characters.
+ULID_BASE62_LENGTH = 22
+
+_RANDOM_BITS = 80
+_lock = threading.Lock()
+_last_timestamp = 0
+_last_random = 0
+
+
+def generate_ulid() -> uuid.UUID:
+    """
+    128-bit id made of a 48-bit millisecond timestamp and 80 random bits. Ids
+    generated in the same millisecond increment the random part, so they stay
+    strictly increasing within a process.
+    """
+    global _last_timestamp, _last_random
+
+    with _lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp <= _last_timestamp:
+            timestamp = _last_timestamp
+            random_part = _last_random + 1
+            if random_part >> _RANDOM_BITS:
+                timestamp, random_part = timestamp + 1, secrets.randbits(_RANDOM_BITS)
+        else:
+            random_part = secrets.randbits(_RANDOM_BITS)
+        _last_timestamp, _last_random = timestamp, random_part
+
+    return uuid.UUID(int=(timestamp << _RANDOM_BITS) | random_part)
+
+
+def get_ulid_datetime(ulid: uuid.UUID) -> datetime.datetime:
+    """
+    Naive local time of the id's timestamp, the same clock as the
+    datetime.now defaults of the models.
+    """
+    return datetime.datetime.fromtimestamp((ulid.int >> _RANDOM_BITS) / 1000)
+
+
+def encode_base62(value: int, length: int = ULID_BASE62_LENGTH) -> str:
+    """
+    Fixed-width base62 text of the value. The alphabet is in ASCII order, so
+    the texts sort like the values only under a bytewise (C) collation; the
+    default collations of Postgres interleave upper and lower case. Order by
+    bill_key, never by bill_number.
+    """
+    chars = []
+    while value:
+        value, remainder = divmod(value, 62)
+        chars.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(chars)).rjust(length, BASE62_ALPHABET[0])
+
+
+def decode_base62(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 62 + BASE62_INDEX[char]
+    return value
+
+
+def parse_ulid(text: str) -> uuid.UUID | None:
+    if len(text) != ULID_BASE62_LENGTH:
+        return None
+    try:
+        value = decode_base62(text)
+    except KeyError:
+        return None
+    if value >> 128:
+        return None
+    return uuid.UUID(int=value)
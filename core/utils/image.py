@@ -0,0 +1,27 @@
+from io import BytesIO
+from typing import BinaryIO
+
+from PIL import Image, ImageOps
+
+
+def make_image_variants(
+    file: BinaryIO, sizes: dict[str, int], quality: int
+) -> dict[str, bytes]:
+    """
+    WebP derivatives of an image, each fitted into sizes[variant] pixels. The
+    EXIF orientation is applied to the pixels, the EXIF data itself is dropped.
+    """
+    with Image.open(file) as image:
+        # JPEG can decode at a reduced scale, far cheaper than full size.
+        image.draft("RGB", (max(sizes.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    variants = {}
+    for variant, size in sizes.items():
+        derivative = image.copy()
+        derivative.thumbnail((size, size))
+        output = BytesIO()
+        derivative.save(output, format="WEBP", quality=quality)
+        variants[variant] = output.getvalue()
+    return variants
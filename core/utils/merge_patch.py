@@ -0,0 +1,15 @@
+def apply_merge_patch(target, patch):
+    """
+    RFC 7396 JSON Merge Patch: objects are merged recursively, a null member
+    removes the key and any other value replaces the target outright.
+    """
+    if not isinstance(patch, dict):
+        return patch
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -25,6 +26,22 @@ from app.file.models import *
 from app.bill.models import *
 
 target_metadata = BillFasterBaseModel.metadata
+# Monthly and DEFAULT partitions of the bill tables are managed outside of the
+# models, see batch/jobs/bill_partition.py.
+PARTITION_TABLE_PATTERN = re.compile(r"_(p\d{6}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    table = object if type_ == "table" else getattr(object, "table", None)
+    if table is not None and PARTITION_TABLE_PATTERN.search(table.name):
+        return False
+    if type_ == "foreign_key_constraint" and PARTITION_TABLE_PATTERN.search(
+        object.referred_table.name
+    ):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,6 +66,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -71,7 +89,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
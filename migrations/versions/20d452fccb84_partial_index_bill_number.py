@@ -0,0 +1,37 @@
+"""partial index bill number
+
+Revision ID: 20d452fccb84
+Revises: afd12633efa2
+Create Date: 2026-10-18 21:55:26.448719
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20d452fccb84"
+down_revision: Union[str, None] = "afd12633efa2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bills with a bill_key are looked up through ix_t_bills_bill_key, only
+    # the older ones need an entry here.
+    op.drop_index("ix_t_bills_bill_number", table_name="t_bills")
+    op.create_index(
+        "ix_t_bills_bill_number",
+        "t_bills",
+        ["bill_number"],
+        unique=False,
+        postgresql_where=sa.text("bill_key IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_t_bills_bill_number", table_name="t_bills")
+    op.create_index("ix_t_bills_bill_number", "t_bills", ["bill_number"], unique=False)
@@ -0,0 +1,91 @@
+"""add default bill partitions
+
+Revision ID: ae3f8d63823e
+Revises: 20d452fccb84
+Create Date: 2026-10-18 21:57:20.581832
+
+"""
+
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "ae3f8d63823e"
+down_revision: Union[str, None] = "20d452fccb84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Parents first: children reference the bill partitions.
+PARTITION_KEYS = {
+    "t_bills": "created_at",
+    "t_bill_items": "bill_created_at",
+    "t_bill_participants": "bill_created_at",
+}
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.date(year, month_index + 1, 1)
+
+
+def upgrade() -> None:
+    # Catches rows outside of the monthly partitions, e.g. when
+    # batch/jobs/bill_partition.py has not run for a while, instead of failing
+    # the insert.
+    for table in PARTITION_KEYS:
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def downgrade() -> None:
+    # Rows in the DEFAULT partitions are moved to monthly partitions, created
+    # for them where missing.
+    bind = op.get_bind()
+    for table in reversed(PARTITION_KEYS):
+        op.execute(
+            f"CREATE TEMPORARY TABLE {table}_moved ON COMMIT DROP AS "
+            f"SELECT * FROM {table}_default"
+        )
+        # Foreign keys of the other tables point into a partition until it
+        # is detached.
+        op.execute(f"ALTER TABLE {table} DETACH PARTITION {table}_default")
+        op.drop_table(f"{table}_default")
+
+    months = (
+        bind.execute(
+            sa.text(
+                "SELECT DISTINCT CAST(date_trunc('month', created_at) AS date) "
+                "FROM t_bills_moved"
+            )
+        )
+        .scalars()
+        .all()
+    )
+    for month in months:
+        for table in PARTITION_KEYS:
+            op.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} "
+                f"PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            )
+
+    for table in PARTITION_KEYS:
+        # Generated columns are computed again on insert.
+        columns = ", ".join(
+            bind.execute(
+                sa.text(
+                    "SELECT attname FROM pg_attribute "
+                    "WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 "
+                    "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum"
+                ),
+                {"table": table},
+            )
+            .scalars()
+            .all()
+        )
+        op.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_moved"
+        )
@@ -0,0 +1,330 @@
+"""partition bill tables
+
+Revision ID: c7e2d4a1f9b3
+Revises: 1f5c3a9e7d20
+Create Date: 2026-10-18 22:31:07.904216
+
+"""
+
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e2d4a1f9b3"
+down_revision: Union[str, None] = "1f5c3a9e7d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Parents first: children reference the bill partitions.
+PARTITION_KEYS = {
+    "t_bills": "created_at",
+    "t_bill_items": "bill_created_at",
+    "t_bill_participants": "bill_created_at",
+}
+# Later months are created by batch/jobs/bill_partition.py.
+PARTITION_MONTHS_AHEAD = 3
+
+BILL_ITEM_COLUMNS = [
+    "id",
+    "bill_id",
+    "name",
+    "description",
+    "quantity",
+    "unit_price",
+    "total",
+    "created_at",
+    "created_by",
+    "updated_at",
+    "updated_by",
+    "deleted_at",
+    "deleted_by",
+]
+BILL_PARTICIPANT_COLUMNS = [
+    "id",
+    "bill_id",
+    "bill_item_id",
+    "amount",
+    "email",
+    "description",
+    "payment_flag",
+    "created_at",
+    "created_by",
+    "updated_at",
+    "updated_by",
+    "deleted_at",
+    "deleted_by",
+    "name",
+]
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.date(year, month_index + 1, 1)
+
+
+def _create_monthly_partitions(start: datetime.date, end: datetime.date) -> None:
+    month = start
+    while month < end:
+        next_month = _add_months(month, 1)
+        for table in PARTITION_KEYS:
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            )
+        month = next_month
+
+
+def upgrade() -> None:
+    # Declarative partitioning cannot be switched on in place: the tables are
+    # rebuilt as partitioned tables, the rows copied over, then the keys and
+    # indexes are built once per partition.
+    for table in PARTITION_KEYS:
+        op.rename_table(table, f"{table}_legacy")
+        op.execute(
+            f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey "
+            f"TO {table}_legacy_pkey"
+        )
+
+    op.execute(
+        "UPDATE t_bills_legacy SET created_at = COALESCE(updated_at, now()) "
+        "WHERE created_at IS NULL"
+    )
+    op.execute(
+        "CREATE TABLE t_bills (LIKE t_bills_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.alter_column("t_bills", "created_at", nullable=False)
+    op.execute(
+        "CREATE TABLE t_bill_items ("
+        "LIKE t_bill_items_legacy INCLUDING DEFAULTS, "
+        "bill_created_at timestamp without time zone NOT NULL"
+        ") PARTITION BY RANGE (bill_created_at)"
+    )
+    op.execute(
+        "CREATE TABLE t_bill_participants ("
+        "LIKE t_bill_participants_legacy INCLUDING DEFAULTS INCLUDING GENERATED, "
+        "bill_created_at timestamp without time zone NOT NULL"
+        ") PARTITION BY RANGE (bill_created_at)"
+    )
+
+    first_created_at, last_created_at = (
+        op.get_bind()
+        .execute(sa.text("SELECT min(created_at), max(created_at) FROM t_bills_legacy"))
+        .one()
+    )
+    current_month = datetime.date.today().replace(day=1)
+    start_month = current_month
+    end_month = _add_months(current_month, PARTITION_MONTHS_AHEAD)
+    if first_created_at:
+        start_month = min(start_month, first_created_at.date().replace(day=1))
+        end_month = max(end_month, last_created_at.date().replace(day=1))
+    _create_monthly_partitions(start_month, _add_months(end_month, 1))
+
+    op.execute("INSERT INTO t_bills SELECT * FROM t_bills_legacy")
+    item_columns = ", ".join(BILL_ITEM_COLUMNS)
+    op.execute(
+        f"INSERT INTO t_bill_items ({item_columns}, bill_created_at) "
+        f"SELECT {', '.join(f'i.{column}' for column in BILL_ITEM_COLUMNS)}, "
+        f"b.created_at FROM t_bill_items_legacy i JOIN t_bills b ON b.id = i.bill_id"
+    )
+    participant_columns = ", ".join(BILL_PARTICIPANT_COLUMNS)
+    op.execute(
+        f"INSERT INTO t_bill_participants ({participant_columns}, bill_created_at) "
+        f"SELECT {', '.join(f'p.{column}' for column in BILL_PARTICIPANT_COLUMNS)}, "
+        f"b.created_at FROM t_bill_participants_legacy p "
+        f"JOIN t_bills b ON b.id = p.bill_id"
+    )
+
+    for table in PARTITION_KEYS:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    for table in reversed(PARTITION_KEYS):
+        op.drop_table(f"{table}_legacy")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_primary_key("t_bills_pkey", "t_bills", ["id", "created_at"])
+    op.create_index(op.f("ix_t_bills_id"), "t_bills", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_t_bills_bill_number"), "t_bills", ["bill_number"], unique=False
+    )
+    op.create_index(
+        "ix_t_bills_bill_key", "t_bills", ["bill_key", "created_at"], unique=True
+    )
+    op.create_index(
+        "ix_t_bills_created_by_created_at_id",
+        "t_bills",
+        ["created_by", "created_at", "id"],
+        unique=False,
+        postgresql_include=[
+            "bill_number",
+            "type",
+            "share_type",
+            "status",
+            "total",
+            "currency",
+            "number_people",
+            "payment_flag",
+        ],
+    )
+
+    op.create_primary_key(
+        "t_bill_items_pkey", "t_bill_items", ["id", "bill_created_at"]
+    )
+    op.create_index(op.f("ix_t_bill_items_id"), "t_bill_items", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_t_bill_items_bill_id"), "t_bill_items", ["bill_id"], unique=False
+    )
+    op.create_foreign_key(
+        "t_bill_items_bill_id_fkey",
+        "t_bill_items",
+        "t_bills",
+        ["bill_id", "bill_created_at"],
+        ["id", "created_at"],
+    )
+
+    op.create_primary_key(
+        "t_bill_participants_pkey", "t_bill_participants", ["id", "bill_created_at"]
+    )
+    op.create_index(
+        op.f("ix_t_bill_participants_id"), "t_bill_participants", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_t_bill_participants_bill_id"),
+        "t_bill_participants",
+        ["bill_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_t_bill_participants_bill_item_id"),
+        "t_bill_participants",
+        ["bill_item_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_t_bill_participants_email_normalized_bill_id",
+        "t_bill_participants",
+        ["email_normalized", "bill_id"],
+        unique=False,
+    )
+    op.create_foreign_key(
+        "t_bill_participants_bill_id_fkey",
+        "t_bill_participants",
+        "t_bills",
+        ["bill_id", "bill_created_at"],
+        ["id", "created_at"],
+    )
+    op.create_foreign_key(
+        "t_bill_participants_bill_item_id_fkey",
+        "t_bill_participants",
+        "t_bill_items",
+        ["bill_item_id", "bill_created_at"],
+        ["id", "bill_created_at"],
+    )
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # The reverse rebuild: plain tables are filled from the partitioned ones,
+    # which are dropped with their partitions. Partitions already moved to the
+    # archive schema are left there.
+    op.execute("CREATE TABLE t_bills_plain (LIKE t_bills INCLUDING DEFAULTS)")
+    op.alter_column("t_bills_plain", "created_at", nullable=True)
+    op.execute("CREATE TABLE t_bill_items_plain (LIKE t_bill_items INCLUDING DEFAULTS)")
+    op.drop_column("t_bill_items_plain", "bill_created_at")
+    op.execute(
+        "CREATE TABLE t_bill_participants_plain ("
+        "LIKE t_bill_participants INCLUDING DEFAULTS INCLUDING GENERATED)"
+    )
+    op.drop_column("t_bill_participants_plain", "bill_created_at")
+
+    op.execute("INSERT INTO t_bills_plain SELECT * FROM t_bills")
+    item_columns = ", ".join(BILL_ITEM_COLUMNS)
+    op.execute(
+        f"INSERT INTO t_bill_items_plain ({item_columns}) "
+        f"SELECT {item_columns} FROM t_bill_items"
+    )
+    participant_columns = ", ".join(BILL_PARTICIPANT_COLUMNS)
+    op.execute(
+        f"INSERT INTO t_bill_participants_plain ({participant_columns}) "
+        f"SELECT {participant_columns} FROM t_bill_participants"
+    )
+
+    # Hand the sequences over first, dropping a table drops the ones it owns.
+    for table in PARTITION_KEYS:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}_plain.id")
+    for table in reversed(PARTITION_KEYS):
+        op.drop_table(table)
+    for table in PARTITION_KEYS:
+        op.rename_table(f"{table}_plain", table)
+
+    op.create_primary_key("t_bills_pkey", "t_bills", ["id"])
+    op.create_index(op.f("ix_t_bills_id"), "t_bills", ["id"], unique=True)
+    op.create_index(
+        op.f("ix_t_bills_bill_number"), "t_bills", ["bill_number"], unique=True
+    )
+    op.create_index(op.f("ix_t_bills_bill_key"), "t_bills", ["bill_key"], unique=True)
+    op.create_index(
+        "ix_t_bills_created_by_created_at_id",
+        "t_bills",
+        ["created_by", "created_at", "id"],
+        unique=False,
+        postgresql_include=[
+            "bill_number",
+            "type",
+            "share_type",
+            "status",
+            "total",
+            "currency",
+            "number_people",
+            "payment_flag",
+        ],
+    )
+
+    op.create_primary_key("t_bill_items_pkey", "t_bill_items", ["id"])
+    op.create_index(op.f("ix_t_bill_items_id"), "t_bill_items", ["id"], unique=True)
+    op.create_index(
+        op.f("ix_t_bill_items_bill_id"), "t_bill_items", ["bill_id"], unique=False
+    )
+    op.create_foreign_key(
+        "t_bill_items_bill_id_fkey", "t_bill_items", "t_bills", ["bill_id"], ["id"]
+    )
+
+    op.create_primary_key("t_bill_participants_pkey", "t_bill_participants", ["id"])
+    op.create_index(
+        op.f("ix_t_bill_participants_id"), "t_bill_participants", ["id"], unique=True
+    )
+    op.create_index(
+        op.f("ix_t_bill_participants_bill_id"),
+        "t_bill_participants",
+        ["bill_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_t_bill_participants_bill_item_id"),
+        "t_bill_participants",
+        ["bill_item_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_t_bill_participants_email_normalized_bill_id",
+        "t_bill_participants",
+        ["email_normalized", "bill_id"],
+        unique=False,
+    )
+    op.create_foreign_key(
+        "t_bill_participants_bill_id_fkey",
+        "t_bill_participants",
+        "t_bills",
+        ["bill_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "t_bill_participants_bill_item_id_fkey",
+        "t_bill_participants",
+        "t_bill_items",
+        ["bill_item_id"],
+        ["id"],
+    )
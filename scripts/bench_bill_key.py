@@ -0,0 +1,256 @@
+"""
+Index cost of bill identifiers, e.g. `python -m scripts.bench_bill_key`.
+Uses tables prefixed bench_ in the configured database, dropped afterwards.
+At 10M bills it needs a few GiB of disk and runs for several minutes.
+
+Loads a year of bills once, then copies them, in creation order, into a table
+indexed like each lookup path and reports the insert time, the index size and
+the cost of point lookups spread over the whole year:
+- the BF<timestamp><uuid4> bill_number with its unique index, as before,
+- the 22-character base62 bill_number, the index the first compact ids kept,
+- bill_key with created_at, the only index new bills add now.
+
+The tables are regular ones, so the indexes compete for shared_buffers the way
+t_bills does; a lookup that misses them is read from the OS page cache or disk.
+"""
+
+import asyncio
+import datetime
+import random
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.bill.services.bill import BILL_KEY_CREATED_AT_WINDOW
+from core.common.database import AsyncSessionLocal, async_engine
+from core.utils.identifier import encode_base62
+from scripts.bench_common import format_ms, percentile
+
+BILLS = 10_000_000
+BATCH_SIZE = 100_000
+LOOKUPS = 10_000
+BILLS_SPAN = datetime.timedelta(days=365)
+
+# Bytewise and linguistic collations, whichever the server has.
+COLLATIONS = ("C", "unicode", "en-US-x-icu", "en_US.utf8")
+
+INDEXES = {
+    "BF bill_number": (
+        "legacy_number",
+        "legacy_number",
+        "legacy_number = :legacy_number",
+    ),
+    "base62 bill_number": (
+        "bill_number",
+        "bill_number",
+        "bill_number = :bill_number",
+    ),
+    # The condition BillService._bill_number_clause builds for a compact id.
+    "bill_key, created_at": (
+        "bill_key",
+        "bill_key, created_at",
+        "bill_key = :bill_key AND created_at BETWEEN :created_from AND :created_to",
+    ),
+}
+
+
+def make_bills(generator: random.Random):
+    """
+    Batches of (legacy_number, bill_number, bill_key, created_at) in creation
+    order. Bills arrive at random over BILLS_SPAN rather than as fast as the
+    script can make them, so the BF numbers are only as out of order as within
+    a second of real traffic.
+    """
+    created_at = datetime.datetime.now() - BILLS_SPAN
+    mean_gap = BILLS_SPAN.total_seconds() / BILLS
+    batch = []
+    for _ in range(BILLS):
+        created_at += datetime.timedelta(seconds=generator.expovariate(1 / mean_gap))
+        # The generate_ulid layout: 48-bit milliseconds, 80 random bits.
+        timestamp = int(created_at.timestamp() * 1000)
+        bill_key = uuid.UUID(int=(timestamp << 80) | generator.getrandbits(80))
+        legacy_uuid = uuid.UUID(int=generator.getrandbits(128), version=4)
+        legacy_number = f"BF{created_at:%Y%m%d%H%M%S}{legacy_uuid.hex}"
+        batch.append((legacy_number, encode_base62(bill_key.int), bill_key, created_at))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def load_bills(generator: random.Random) -> list[dict]:
+    """Copies the bills into bench_bill_source, returns a sample of them."""
+    sample_every = BILLS // LOOKUPS
+    sample = []
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(
+            text(
+                "CREATE UNLOGGED TABLE bench_bill_source (legacy_number varchar(100), "
+                "bill_number varchar(100), bill_key uuid, created_at timestamp)"
+            )
+        )
+        connection = await db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        for batch in make_bills(generator):
+            await raw_connection.driver_connection.copy_records_to_table(
+                "bench_bill_source", records=batch
+            )
+            sample += batch[::sample_every]
+        await db_session.commit()
+    columns = ("legacy_number", "bill_number", "bill_key", "created_at")
+    return [dict(zip(columns, bill)) for bill in sample]
+
+
+async def measure_index(
+    name: str, column: str, index_columns: str, condition: str, sample: list
+):
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(
+            text(
+                "CREATE TABLE bench_bills (legacy_number varchar(100), "
+                "bill_number varchar(100), bill_key uuid, created_at timestamp)"
+            )
+        )
+        await db_session.execute(
+            text(
+                f"CREATE UNIQUE INDEX bench_bills_idx ON bench_bills ({index_columns})"
+            )
+        )
+        await db_session.commit()
+
+        # A synchronized scan could start mid-table, out of creation order.
+        await db_session.execute(text("SET synchronize_seqscans = off"))
+        started_at = time.perf_counter()
+        await db_session.execute(
+            text(
+                f"INSERT INTO bench_bills ({column}, created_at) "
+                f"SELECT {column}, created_at FROM bench_bill_source"
+            )
+        )
+        await db_session.commit()
+        elapsed = time.perf_counter() - started_at
+        await db_session.execute(text("ANALYZE bench_bills"))
+        index_size = await db_session.scalar(
+            text("SELECT pg_relation_size('bench_bills_idx')")
+        )
+        await db_session.commit()
+
+        blocks_before = await get_index_blocks(db_session)
+        lookup = text(f"SELECT created_at FROM bench_bills WHERE {condition}")
+        durations = []
+        for bill in sample:
+            parameters = {
+                column: bill[column],
+                "created_from": bill["created_at"] - BILL_KEY_CREATED_AT_WINDOW,
+                "created_to": bill["created_at"] + BILL_KEY_CREATED_AT_WINDOW,
+            }
+            lookup_started_at = time.perf_counter()
+            await db_session.execute(lookup, parameters)
+            durations.append(time.perf_counter() - lookup_started_at)
+        await db_session.commit()
+        blocks_read, blocks_hit = [
+            after - before
+            for before, after in zip(blocks_before, await get_index_blocks(db_session))
+        ]
+
+        await db_session.execute(text("DROP TABLE bench_bills"))
+        await db_session.commit()
+    print(
+        f"{name:<22} index {index_size / 1024 / 1024:7.1f} MiB  "
+        f"insert {format_ms(elapsed)}  "
+        f"lookup p50 {format_ms(percentile(durations, 0.5))} "
+        f"p99 {format_ms(percentile(durations, 0.99))}  "
+        f"index blocks {blocks_read / len(sample):.2f} read, "
+        f"{blocks_hit / len(sample):.2f} hit per lookup"
+    )
+
+
+async def get_index_blocks(db_session) -> tuple[int, int]:
+    # Flushes the counters of this backend, then reads them in a new snapshot.
+    await db_session.execute(text("SELECT pg_stat_force_next_flush()"))
+    await db_session.commit()
+    await asyncio.sleep(0.1)
+    row = (
+        await db_session.execute(
+            text(
+                "SELECT idx_blks_read, idx_blks_hit FROM pg_statio_user_indexes "
+                "WHERE indexrelname = 'bench_bills_idx'"
+            )
+        )
+    ).one()
+    await db_session.commit()
+    return row.idx_blks_read, row.idx_blks_hit
+
+
+async def check_collation(sample: list):
+    # The base62 alphabet is in ASCII order: text order is key order under a
+    # bytewise collation only.
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(
+            text("CREATE TEMPORARY TABLE bench_numbers (bill_number varchar(100))")
+        )
+        await db_session.execute(
+            text("INSERT INTO bench_numbers VALUES (:bill_number)"), sample
+        )
+        expected = sorted(bill["bill_number"] for bill in sample)
+        database_collation = await db_session.scalar(
+            text(
+                "SELECT datcollate FROM pg_database WHERE datname = current_database()"
+            )
+        )
+        collations = await db_session.scalars(
+            text("SELECT collname FROM pg_collation WHERE collname = ANY(:names)"),
+            {"names": list(COLLATIONS)},
+        )
+        print(f"database collation {database_collation}")
+        for collation in collations.all():
+            try:
+                async with db_session.begin_nested():
+                    result = await db_session.scalars(
+                        text(
+                            "SELECT bill_number FROM bench_numbers "
+                            f'ORDER BY bill_number COLLATE "{collation}"'
+                        )
+                    )
+                    in_order = result.all() == expected
+            except DBAPIError:
+                # ICU collations exist in the catalog of builds without ICU.
+                continue
+            print(f"base62 text sorts in key order, {collation} collation: {in_order}")
+        await db_session.rollback()
+
+
+async def drop_tables():
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(text("DROP TABLE IF EXISTS bench_bills"))
+        await db_session.execute(text("DROP TABLE IF EXISTS bench_bill_source"))
+        await db_session.commit()
+
+
+async def main():
+    # Seeded, so every run indexes the same bills.
+    generator = random.Random(BILLS)
+    try:
+        async with AsyncSessionLocal() as db_session:
+            shared_buffers = await db_session.scalar(text("SHOW shared_buffers"))
+        started_at = time.perf_counter()
+        sample = await load_bills(generator)
+        print(
+            f"{BILLS} bills over {BILLS_SPAN.days} days generated and loaded in "
+            f"{format_ms(time.perf_counter() - started_at)}, inserted in creation "
+            f"order; {len(sample)} uniform lookups, shared_buffers {shared_buffers}"
+        )
+        generator.shuffle(sample)
+        for name, (column, index_columns, condition) in INDEXES.items():
+            await measure_index(name, column, index_columns, condition, sample)
+        await check_collation(sample)
+    finally:
+        await drop_tables()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
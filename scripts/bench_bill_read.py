@@ -0,0 +1,82 @@
+"""
+Round trips and latency of a bill detail read, e.g.
+`python -m scripts.bench_bill_read`. Runs against the configured database;
+the bill it creates is deleted afterwards.
+
+Compared with the per-row loading the reads replaced: the bill, its items,
+its participants, then each file by id.
+"""
+
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import Select
+
+from app.bill.models import Bill, BillItem, BillParticipant
+from app.bill.services.bill import BillService
+from app.bill.services.cache import bill_detail_cache
+from app.file.models import FileSystem
+from core.common.database import AsyncSessionLocal, async_engine
+from scripts.bench_common import (
+    count_queries,
+    create_bench_bill,
+    delete_bench_bill,
+    format_ms,
+    percentile,
+)
+
+ITEMS = 20
+PARTICIPANTS = 10
+READS = 200
+
+
+async def read_bill(bill_number: str):
+    async with AsyncSessionLocal() as db_session:
+        await BillService(db_session).get_shared_by_bill_number(None, bill_number)
+
+
+async def read_bill_per_row(bill_number: str):
+    async with AsyncSessionLocal() as db_session:
+        bill = await db_session.scalar(
+            Select(Bill).where(BillService._bill_number_clause(bill_number))
+        )
+        for model in (BillItem, BillParticipant):
+            await db_session.scalars(Select(model).where(model.bill_id == bill.id))
+        for file_id in (bill.bill_file_id, bill.payment_file_id):
+            await db_session.get(FileSystem, file_id)
+
+
+async def measure(name: str, read, bill_number: str, clear_cache: bool):
+    timings, query_counts = [], []
+    for _ in range(READS):
+        if clear_cache:
+            bill_detail_cache.local_cache.clear()
+        with count_queries() as statements:
+            started_at = time.perf_counter()
+            await read(bill_number)
+            timings.append(time.perf_counter() - started_at)
+        query_counts.append(len(statements))
+    print(
+        f"{name:<28} {statistics.median_low(query_counts):>2} queries  "
+        f"p50 {format_ms(statistics.median(timings))}  "
+        f"p99 {format_ms(percentile(timings, 0.99))}"
+    )
+
+
+async def main():
+    # Only the in-process tier is measured, Redis is left out.
+    bill_detail_cache.redis_client = None
+    bill_number = await create_bench_bill(ITEMS, PARTICIPANTS, with_files=True)
+    try:
+        print(f"bill with {ITEMS} items, {PARTICIPANTS} participants, 2 files")
+        await measure("per-row loading", read_bill_per_row, bill_number, False)
+        await measure("read, detail cache miss", read_bill, bill_number, True)
+        await measure("read, detail cache hit", read_bill, bill_number, False)
+    finally:
+        await delete_bench_bill(bill_number)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Write cost of toggling one participant's payment flag through the full bill
+update, e.g. `python -m scripts.bench_bill_update`. Runs against the
+configured database; the bill it creates is deleted afterwards.
+
+Compared with rewriting the children, the update path the reconciliation
+replaced: every item and participant deleted and inserted again.
+"""
+
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import Select, delete, insert, text
+
+from app.bill.models import Bill, BillItem, BillParticipant
+from app.bill.schemas.bill import BillCrUpSchema
+from app.bill.services.bill import BillService
+from core.common.database import AsyncSessionLocal, async_engine
+from scripts.bench_common import (
+    BENCH_USER,
+    count_queries,
+    create_bench_bill,
+    delete_bench_bill,
+    format_ms,
+)
+
+ITEMS = 20
+PARTICIPANTS = 100
+UPDATES = 20
+
+CHILD_COLUMNS = {
+    BillItem: ["name", "description", "quantity", "unit_price", "total"],
+    BillParticipant: ["name", "amount", "email", "description", "payment_flag"],
+}
+
+
+async def get_wal_position() -> str:
+    async with AsyncSessionLocal() as db_session:
+        return await db_session.scalar(text("SELECT pg_current_wal_insert_lsn()"))
+
+
+async def get_wal_bytes(since: str) -> int:
+    async with AsyncSessionLocal() as db_session:
+        query = text("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), :since)")
+        return int(await db_session.scalar(query, {"since": since}))
+
+
+async def toggle_payment(bill_number: str, round_index: int):
+    async with AsyncSessionLocal() as db_session:
+        detail, _ = await BillService(db_session).get_by_bill_number(
+            BENCH_USER, bill_number
+        )
+    detail["bill_participants"][0]["payment_flag"] = round_index % 2 == 0
+    update_schema = BillCrUpSchema.model_validate(detail)
+    async with AsyncSessionLocal() as db_session:
+        with count_queries() as statements:
+            started_at = time.perf_counter()
+            await BillService(db_session).update(BENCH_USER, bill_number, update_schema)
+            elapsed = time.perf_counter() - started_at
+    return statements, elapsed
+
+
+async def rewrite_children(bill_number: str, round_index: int):
+    async with AsyncSessionLocal() as db_session:
+        bill = await db_session.scalar(
+            Select(Bill).where(BillService._bill_number_clause(bill_number))
+        )
+        rows = {}
+        for model, columns in CHILD_COLUMNS.items():
+            result = await db_session.execute(
+                Select(*(getattr(model, column) for column in columns)).where(
+                    model.bill_id == bill.id
+                )
+            )
+            rows[model] = [row._asdict() for row in result]
+        rows[BillParticipant][0]["payment_flag"] = round_index % 2 == 0
+
+        with count_queries() as statements:
+            started_at = time.perf_counter()
+            # Participants reference items, they go first and come back last.
+            for model in (BillParticipant, BillItem):
+                await db_session.execute(delete(model).where(model.bill_id == bill.id))
+            for model in (BillItem, BillParticipant):
+                children = [
+                    {**row, "bill_id": bill.id, "bill_created_at": bill.created_at}
+                    for row in rows[model]
+                ]
+                await db_session.execute(insert(model), children)
+            await db_session.commit()
+            elapsed = time.perf_counter() - started_at
+    return statements, elapsed
+
+
+async def measure(name: str, write, bill_number: str):
+    timings, query_counts, wal_sizes = [], [], []
+    for round_index in range(UPDATES):
+        wal_position = await get_wal_position()
+        statements, elapsed = await write(bill_number, round_index)
+        timings.append(elapsed)
+        wal_sizes.append(await get_wal_bytes(wal_position))
+        query_counts.append(
+            sum(
+                statement.split(None, 1)[0] in ("INSERT", "UPDATE", "DELETE")
+                for statement in statements
+            )
+        )
+    print(
+        f"{name:<24} {statistics.median_low(query_counts):>2} writes  "
+        f"WAL {statistics.median_low(wal_sizes) / 1024:.1f} KiB  "
+        f"median {format_ms(statistics.median(timings))}"
+    )
+
+
+async def main():
+    bill_number = await create_bench_bill(ITEMS, PARTICIPANTS)
+    try:
+        print(f"bill with {ITEMS} items, {PARTICIPANTS} participants")
+        await measure("rewrite children", rewrite_children, bill_number)
+        await measure("reconcile by id", toggle_payment, bill_number)
+    finally:
+        await delete_bench_bill(bill_number)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
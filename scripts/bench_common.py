@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import statistics
+import time
+from decimal import Decimal
+
+from sqlalchemy import Select, delete, event, update
+
+from app.bill.models import Bill, BillItem, BillParticipant
+from app.bill.schemas.bill import BillCrUpSchema
+from app.bill.services.bill import BillService
+from app.common.constants import BillShareType, BillStatus, BillType
+from app.file.models import FileSystem
+from core.common.database import AsyncSessionLocal, async_engine
+
+# The owner of the rows the benchmarks create, they are deleted by it.
+BENCH_USER = {
+    "id": None,
+    "user_id": "bench-user",
+    "email": "bench-user@example.com",
+    "role": None,
+}
+
+
+async def create_bench_bill(
+    items: int, participants: int, with_files: bool = False
+) -> str:
+    """
+    Public, finalized restaurant bill owned by BENCH_USER, returns its bill
+    number.
+    """
+    async with AsyncSessionLocal() as db_session:
+        file_ids = [None, None]
+        if with_files:
+            files = [
+                FileSystem(
+                    file_name=f"bench-{name}.jpg",
+                    file_path=f"http://bench/bucket/bench-{name}.jpg",
+                    file_type="image/jpeg",
+                )
+                for name in ("bill", "payment")
+            ]
+            db_session.add_all(files)
+            await db_session.flush()
+            file_ids = [file.id for file in files]
+
+        subtotal = Decimal(10) * items
+        bill = BillCrUpSchema(
+            type=BillType.RESTAURANT,
+            share_type=BillShareType.PUBLIC,
+            subtotal=subtotal,
+            total=subtotal,
+            number_people=participants,
+            bill_file_id=file_ids[0],
+            payment_file_id=file_ids[1],
+            bill_items=[
+                {"name": f"item {index}", "quantity": Decimal(1), "total": Decimal(10)}
+                for index in range(items)
+            ],
+            bill_participants=[
+                {
+                    "name": f"participant {index}",
+                    "email": f"bench-{index}@example.com",
+                    "amount": subtotal / participants,
+                }
+                for index in range(participants)
+            ],
+        )
+        result = await BillService(db_session).create(BENCH_USER, bill)
+        # The create schema has no status, bills always start as drafts.
+        await db_session.execute(
+            update(Bill)
+            .where(BillService._bill_number_clause(result["bill_number"]))
+            .values(status=BillStatus.FINALIZED)
+        )
+        await db_session.commit()
+        return result["bill_number"]
+
+
+async def delete_bench_bill(bill_number: str):
+    async with AsyncSessionLocal() as db_session:
+        bill = await db_session.scalar(
+            Select(Bill).where(BillService._bill_number_clause(bill_number))
+        )
+        for model in (BillParticipant, BillItem):
+            await db_session.execute(delete(model).where(model.bill_id == bill.id))
+        await db_session.execute(delete(Bill).where(Bill.id == bill.id))
+        await db_session.execute(
+            delete(FileSystem).where(
+                FileSystem.id.in_([bill.bill_file_id, bill.payment_file_id])
+            )
+        )
+        await db_session.commit()
+
+
+@contextlib.contextmanager
+def count_queries():
+    """Statements sent through the app engine inside the block."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+class LoopLagMonitor:
+    """
+    How late a short timer fires on the running event loop. Anything blocking
+    the loop shows up as lag, which every concurrent request pays.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(time.perf_counter() - started_at - self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # A stall that ends with the block is only recorded once the pending
+        # timer gets to run.
+        await asyncio.sleep(self.interval * 2)
+        self._task.cancel()
+
+    def summary(self) -> str:
+        if not self.lags:
+            return "loop lag n/a"
+        p99 = percentile(self.lags, 0.99)
+        return f"loop lag p99 {format_ms(p99)}, max {format_ms(max(self.lags))}"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def median_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings)
@@ -0,0 +1,87 @@
+"""
+Time and event loop stall of concurrent image variants, e.g.
+`python -m scripts.bench_image_variants`. Pure computation, no storage.
+
+Compares the thread pool the variants run in with a spawn-context process
+pool, which has to pickle every image to its worker and back.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+import config
+from app.file.services.file import FILE_IMAGE_VARIANT_SIZES
+from core.utils.image import make_image_variants
+from scripts.bench_common import LoopLagMonitor, format_ms
+
+IMAGES = 8
+# A 12 MP phone photo.
+IMAGE_SIZE = (4032, 3024)
+
+
+def make_variants(content: bytes) -> dict:
+    return make_image_variants(
+        io.BytesIO(content), FILE_IMAGE_VARIANT_SIZES, config.FILE_IMAGE_QUALITY
+    )
+
+
+def make_photo() -> bytes:
+    # Seeded shapes, so the JPEG compresses like a photo rather than noise.
+    generator = random.Random(IMAGE_SIZE[0])
+    image = Image.new("RGB", IMAGE_SIZE, "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(2000):
+        x, y = generator.randrange(IMAGE_SIZE[0]), generator.randrange(IMAGE_SIZE[1])
+        size = generator.randint(20, 400)
+        color = tuple(generator.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + size, y + size), fill=color)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=85)
+    return output.getvalue()
+
+
+async def measure(name: str, executor: Executor, content: bytes):
+    loop = asyncio.get_running_loop()
+    # Starts the workers, a spawned process imports Pillow first.
+    await loop.run_in_executor(executor, make_variants, content)
+    async with LoopLagMonitor() as monitor:
+        await asyncio.sleep(monitor.interval * 2)
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, make_variants, content)
+                for _ in range(IMAGES)
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+    executor.shutdown()
+    print(f"{name:<8} total {format_ms(elapsed)}  {monitor.summary()}")
+
+
+async def main():
+    content = make_photo()
+    print(
+        f"{IMAGES} concurrent {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} JPEGs of "
+        f"{len(content) // 1024} KiB, {config.FILE_IMAGE_WORKERS} workers"
+    )
+    await measure(
+        "threads", ThreadPoolExecutor(max_workers=config.FILE_IMAGE_WORKERS), content
+    )
+    await measure(
+        "process",
+        ProcessPoolExecutor(
+            max_workers=config.FILE_IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        ),
+        content,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
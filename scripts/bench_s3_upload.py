@@ -0,0 +1,85 @@
+"""
+Event loop stall of concurrent uploads, e.g. `python -m scripts.bench_s3_upload`.
+Runs against the configured bucket; the objects it uploads are deleted
+afterwards.
+
+Compared with calling the blocking boto3 upload straight from the coroutine,
+the way the upload path ran before it moved to the upload pool.
+"""
+
+import asyncio
+import io
+import time
+
+import config
+from core.services.aws import S3Service
+from core.utils.identifier import encode_base62, generate_ulid
+from scripts.bench_common import LoopLagMonitor, format_ms
+
+UPLOADS = 50
+UPLOAD_SIZE = 2 * 1024 * 1024
+LARGE_UPLOAD_SIZE = 20 * 1024 * 1024
+
+
+async def upload_inline(s3_service: S3Service, file_key: str, content: bytes):
+    return s3_service.bucket_upload_object(
+        config.AWS_S3_BUCKET_NAME, file_key, io.BytesIO(content)
+    )
+
+
+async def upload_pooled(s3_service: S3Service, file_key: str, content: bytes):
+    return await s3_service.bucket_upload_object_async(
+        config.AWS_S3_BUCKET_NAME, file_key, io.BytesIO(content)
+    )
+
+
+async def measure(name: str, upload, s3_service: S3Service, prefix: str) -> list:
+    content = b"\0" * UPLOAD_SIZE
+    async with LoopLagMonitor() as monitor:
+        # Let the monitor start its first sample before the uploads do.
+        await asyncio.sleep(monitor.interval * 2)
+        started_at = time.perf_counter()
+        urls = await asyncio.gather(
+            *(
+                upload(s3_service, f"{prefix}/{name}-{index}", content)
+                for index in range(UPLOADS)
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+    print(f"{name:<7} total {format_ms(elapsed)}  {monitor.summary()}")
+    return urls
+
+
+def get_parts_count(s3_service: S3Service, file_key: str) -> int:
+    # Multipart ETags end in -<parts>, single-part ones have no suffix.
+    response = s3_service.client.head_object(
+        Bucket=config.AWS_S3_BUCKET_NAME, Key=file_key
+    )
+    etag = response["ETag"].strip('"')
+    return int(etag.rsplit("-", 1)[1]) if "-" in etag else 1
+
+
+async def main():
+    s3_service = S3Service()
+    prefix = f"bench/{encode_base62(generate_ulid().int)}"
+    urls = []
+    try:
+        print(f"{UPLOADS} concurrent uploads of {UPLOAD_SIZE // 1024 // 1024} MiB")
+        urls += await measure("inline", upload_inline, s3_service, prefix)
+        urls += await measure("pooled", upload_pooled, s3_service, prefix)
+
+        file_key = f"{prefix}/large"
+        urls.append(
+            await upload_pooled(s3_service, file_key, b"\0" * LARGE_UPLOAD_SIZE)
+        )
+        print(
+            f"{LARGE_UPLOAD_SIZE // 1024 // 1024} MiB object uploaded in "
+            f"{get_parts_count(s3_service, file_key)} parts"
+        )
+    finally:
+        for url in urls:
+            s3_service.bucket_delete_file_url(url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Time and transfer count of the settlement solvers, e.g.
+`python -m scripts.bench_settle`. Pure computation, no database.
+"""
+
+import random
+
+from app.bill.services.settlement import (
+    EXACT_SETTLEMENT_MAX_SIZE,
+    settle_exact,
+    settle_greedy,
+)
+from scripts.bench_common import format_ms, median_time
+
+GREEDY_SIZES = [50, 500, 5000]
+EXACT_SIZES = [8, 10, EXACT_SETTLEMENT_MAX_SIZE, EXACT_SETTLEMENT_MAX_SIZE + 2]
+REPEAT = 5
+
+
+def make_balances(size: int) -> dict[str, int]:
+    # Seeded, and made of small zero-sum groups the exact solver can find.
+    generator = random.Random(size)
+    balances = {}
+    while len(balances) < size:
+        group = [
+            generator.randint(-50000, 50000)
+            for _ in range(min(3, size - len(balances) - 1))
+        ]
+        for amount in group + [-sum(group)]:
+            balances[f"user-{len(balances)}@example.com"] = amount
+    return balances
+
+
+def main():
+    for size in GREEDY_SIZES:
+        balances = make_balances(size)
+        elapsed = median_time(lambda: settle_greedy(balances), REPEAT)
+        transfers = len(settle_greedy(balances))
+        print(
+            f"greedy {size:>5} balances  {transfers:>4} transfers  {format_ms(elapsed)}"
+        )
+    for size in EXACT_SIZES:
+        balances = make_balances(size)
+        elapsed = median_time(lambda: settle_exact(balances), REPEAT)
+        transfers = len(settle_exact(balances))
+        greedy_transfers = len(settle_greedy(balances))
+        print(
+            f"exact  {size:>5} balances  {transfers:>4} transfers "
+            f"(greedy {greedy_transfers})  {format_ms(elapsed)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Time of the split engine on dense restaurant bills, e.g.
+`python -m scripts.bench_split`. Pure computation, no database.
+
+Reports the whole compute_split, which reads the weights out of the parsed
+schema, and the largest-remainder allocation of the weight matrix alone.
+"""
+
+import random
+from decimal import Decimal
+
+import numpy as np
+
+from app.bill.schemas.bill import BillComputeSchema
+from app.bill.services.split import (
+    WEIGHT_SCALE,
+    allocate_largest_remainder,
+    compute_split,
+)
+from app.common.constants import BillType
+from scripts.bench_common import format_ms, median_time
+
+# (items, participants)
+BILL_SIZES = [(10, 4), (200, 50), (1000, 100)]
+REPEAT = 20
+
+
+def make_compute_schema(items: int, participants: int) -> BillComputeSchema:
+    # Seeded, so every run splits the same bills.
+    generator = random.Random(items * participants)
+    bill_items = [
+        {
+            "total": Decimal(generator.randint(100, 100000)) / 100,
+            "weights": [generator.randint(0, 3) or 1 for _ in range(participants)],
+        }
+        for _ in range(items)
+    ]
+    subtotal = sum(item["total"] for item in bill_items)
+    return BillComputeSchema(
+        type=BillType.RESTAURANT,
+        subtotal=subtotal,
+        tax_flag=True,
+        tax_percent=Decimal("8.875"),
+        service_flag=True,
+        service_percent=Decimal(10),
+        tip_flag=True,
+        tip_percent=Decimal(18),
+        number_people=participants,
+        bill_items=bill_items,
+    )
+
+
+def main():
+    for items, participants in BILL_SIZES:
+        compute_schema = make_compute_schema(items, participants)
+        elapsed = median_time(lambda: compute_split(compute_schema), REPEAT)
+        totals = np.array([int(item.total * 100) for item in compute_schema.bill_items])
+        weights = np.array(
+            [item.weights for item in compute_schema.bill_items], dtype=np.int64
+        )
+        allocation_elapsed = median_time(
+            lambda: allocate_largest_remainder(totals, weights * WEIGHT_SCALE), REPEAT
+        )
+        print(
+            f"{items:>5} items x {participants:>3} participants  "
+            f"compute {format_ms(elapsed)}  allocation {format_ms(allocation_elapsed)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,9 @@
         description: participant.description || null
       })),
       billFileUrl: apiData.bill_file_url,
+      // Resized copies, the original is only fetched to download or print
+      billFileThumbnailUrl: apiData.bill_file_thumbnail_url || apiData.bill_file_url,
+      billFileMediumUrl: apiData.bill_file_medium_url || apiData.bill_file_url,
       paymentFileUrl: apiData.payment_file_url,
       paymentMethod: apiData.payment_method,
       paymentFlag: apiData.payment_flag,
@@ -157,6 +160,12 @@
     if (viewBillBtn) {
       if (billData.billFileUrl) {
         viewBillBtn.style.display = 'inline-flex';
+        const thumbnail = document.createElement('img');
+        thumbnail.src = billData.billFileThumbnailUrl;
+        thumbnail.alt = '';
+        thumbnail.className = 'w-5 h-5 rounded object-cover';
+        thumbnail.onerror = () => thumbnail.remove();
+        viewBillBtn.prepend(thumbnail);
       } else {
         viewBillBtn.style.display = 'none';
       }
@@ -606,7 +615,7 @@
 
     viewUploadedBillBtn?.addEventListener('click', () => {
       if (billData && billData.billFileUrl) {
-        showBillModal(billData.billFileUrl);
+        showBillModal(billData.billFileUrl, billData.billFileMediumUrl);
       }
     });
 
@@ -623,19 +632,18 @@
       }
     });
 
-    function showBillModal(fileUrl) {
+    function showBillModal(fileUrl, previewUrl) {
       // Determine file type from URL extension (handle query parameters)
-      const urlWithoutParams = fileUrl.split('?')[0]; // Remove query parameters
-      const fileExtension = urlWithoutParams.split('.').pop().toLowerCase();
-      const isImage = ['jpg', 'jpeg', 'png', 'gif', 'webp'].includes(fileExtension);
-      const isPdf = fileExtension === 'pdf';
+      const getExtension = (url) => url.split('?')[0].split('.').pop().toLowerCase();
+      const isImage = ['jpg', 'jpeg', 'png', 'gif', 'webp'].includes(getExtension(previewUrl));
+      const isPdf = getExtension(fileUrl) === 'pdf';
       
       if (isImage) {
         // Display image
         billContent.innerHTML = `
           <div class="space-y-4">
             <div class="bg-white rounded-lg border border-slate-200 p-4">
-              <img src="${fileUrl}" 
+              <img src="${previewUrl}" 
                    alt="Uploaded Bill" 
                    class="max-w-full h-auto max-h-96 mx-auto rounded-lg shadow-sm"
                    onerror="this.parentElement.innerHTML='<p class=\\'text-center text-red-500\\'>Failed to load image</p>'">